@@ -6,47 +6,41 @@ Analyze ornaments image structure
 from PIL import Image
 import numpy as np
 
-def analyze_image_structure(input_path):
-    """Analyze the image to understand ornament layout"""
-    img = Image.open(input_path)
-    
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
-    
-    width, height = img.size
-    print(f"Image size: {width}x{height}")
-    
-    # Convert to numpy array for easier analysis
-    img_array = np.array(img)
-    alpha_channel = img_array[:, :, 3]
-    
-    # Find rows with content by checking alpha channel
-    row_has_content = []
-    for y in range(height):
-        non_transparent_pixels = np.sum(alpha_channel[y, :] > 50)
-        row_has_content.append(non_transparent_pixels)
+import plane_cache
+from gaps import projection_profile, interior_gaps
+
+def analyze_image_structure(input_path, plane_dir=None, coarse_factor=None):
+    """
+    Analyze the image to understand ornament layout
+
+    With plane_dir set, the alpha channel is read from the memory-mapped
+    plane cache instead of decoding the sheet. With coarse_factor set, the
+    profiles are computed coarse-to-fine (same result).
+    """
+    if plane_dir:
+        alpha_channel = plane_cache.load_alpha(input_path, plane_dir)
+        height, width = alpha_channel.shape
+        print(f"Image size: {width}x{height}")
+    else:
+        img = Image.open(input_path)
+        
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        
+        width, height = img.size
+        print(f"Image size: {width}x{height}")
+        
+        # Convert to numpy array for easier analysis
+        img_array = np.array(img)
+        alpha_channel = img_array[:, :, 3]
     
-    # Find columns with content
-    col_has_content = []
-    for x in range(width):
-        non_transparent_pixels = np.sum(alpha_channel[:, x] > 50)
-        col_has_content.append(non_transparent_pixels)
+    # Count pixels with content in every row and column at once
+    row_has_content = projection_profile(alpha_channel, threshold=50, axis=1, coarse_factor=coarse_factor)
+    col_has_content = projection_profile(alpha_channel, threshold=50, axis=0, coarse_factor=coarse_factor)
     
     # Detect row boundaries (gaps in content)
     print("\n=== ROW ANALYSIS ===")
-    row_gaps = []
-    in_gap = True
-    gap_start = 0
-    
-    for y in range(height):
-        if row_has_content[y] < 10:  # Almost empty row
-            if not in_gap:
-                in_gap = True
-                gap_start = y
-        else:  # Has content
-            if in_gap and gap_start > 0:
-                row_gaps.append((gap_start, y))
-            in_gap = False
+    row_gaps = interior_gaps(row_has_content, max_content=10)  # Almost empty rows
     
     print(f"Found {len(row_gaps)} row gaps:")
     for i, (start, end) in enumerate(row_gaps):
@@ -54,19 +48,7 @@ def analyze_image_structure(input_path):
     
     # Detect column boundaries
     print("\n=== COLUMN ANALYSIS ===")
-    col_gaps = []
-    in_gap = True
-    gap_start = 0
-    
-    for x in range(width):
-        if col_has_content[x] < 10:  # Almost empty column
-            if not in_gap:
-                in_gap = True
-                gap_start = x
-        else:  # Has content
-            if in_gap and gap_start > 0:
-                col_gaps.append((gap_start, x))
-            in_gap = False
+    col_gaps = interior_gaps(col_has_content, max_content=10)  # Almost empty columns
     
     print(f"Found {len(col_gaps)} column gaps:")
     for i, (start, end) in enumerate(col_gaps):
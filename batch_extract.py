@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Batch ornament extraction
+Runs an extraction strategy over many sprite sheets using a process pool
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import instrumentation
+
+STRATEGIES = ('components', 'grid', 'gaps')
+
+def expand_inputs(patterns):
+    """Expand file names and glob patterns into a sorted list of unique paths"""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        paths.update(os.path.abspath(m) for m in matches if os.path.isfile(m))
+    return sorted(paths)
+
+def sheet_output_dirs(input_paths, output_root):
+    """Pick one output folder per sheet, named after the file"""
+    dirs = {}
+    used = set()
+    for path in input_paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        candidate = name
+        suffix = 2
+        while candidate in used:
+            candidate = f"{name}-{suffix}"
+            suffix += 1
+        used.add(candidate)
+        dirs[path] = os.path.join(output_root, candidate)
+    return dirs
+
+def extract_sheet(input_path, output_dir, strategy, cache_dir=None, strip_height=None, plane_dir=None,
+                  trace=False, png_error=None, compress_level=6):
+    """
+    Run one strategy on one sheet, keeping its console output in a log file
+    (and its stage timings in trace.json when trace is set)
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    os.makedirs(output_dir, exist_ok=True)
+    traced = contextlib.nullcontext()
+    if trace:
+        traced = instrumentation.trace_run(strategy, os.path.join(output_dir, 'trace.json'), input=input_path)
+
+    try:
+        with contextlib.redirect_stdout(log), traced:
+            if strategy == 'components':
+                from extract_individual import separate_all_ornaments
+                count = separate_all_ornaments(input_path, output_dir, cache_dir=cache_dir,
+                                               strip_height=strip_height, plane_dir=plane_dir,
+                                               png_error=png_error, compress_level=compress_level)
+            elif strategy == 'grid':
+                from separate_ornaments_smart import separate_ornaments_smart
+                count = separate_ornaments_smart(input_path, output_dir, png_error=png_error,
+                                                 compress_level=compress_level)
+            elif strategy == 'gaps':
+                from extract_smart import extract_ornaments
+                count = extract_ornaments(input_path, output_dir, plane_dir=plane_dir, png_error=png_error,
+                                          compress_level=compress_level)
+            else:
+                raise ValueError(f"Unknown strategy: {strategy}")
+        error = None
+    except Exception as e:
+        count = 0
+        error = f"{type(e).__name__}: {e}"
+
+    with open(os.path.join(output_dir, 'extract.log'), 'w') as f:
+        f.write(log.getvalue())
+
+    return {
+        'input': input_path,
+        'output_dir': output_dir,
+        'strategy': strategy,
+        'count': count,
+        'seconds': round(time.perf_counter() - start, 3),
+        'error': error,
+    }
+
+def run_batch(input_paths, output_root, strategy='components', workers=None, cache_dir=None,
+              strip_height=None, plane_dir=None, trace=False, png_error=None, compress_level=6):
+    """Extract every sheet in parallel and write summary.json to output_root"""
+    os.makedirs(output_root, exist_ok=True)
+    output_dirs = sheet_output_dirs(input_paths, output_root)
+
+    results = []
+    start = time.perf_counter()
+    # ru_maxrss never goes down, so traced sheets each get a fresh worker
+    # process and the peak RSS in trace.json is that sheet's own
+    pool_options = {'max_tasks_per_child': 1} if trace else {}
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as executor:
+        futures = [
+            executor.submit(extract_sheet, path, output_dirs[path], strategy, cache_dir, strip_height, plane_dir,
+                            trace, png_error, compress_level)
+            for path in input_paths
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['error']:
+                print(f"✗ {result['input']}: {result['error']}")
+            else:
+                print(f"✓ {result['input']}: {result['count']} ornaments ({result['seconds']}s)")
+
+    results.sort(key=lambda r: r['input'])
+    summary = {
+        'strategy': strategy,
+        'workers': workers or os.cpu_count(),
+        'sheets': len(results),
+        'ornaments': sum(r['count'] for r in results),
+        'failed': sum(1 for r in results if r['error']),
+        'seconds': round(time.perf_counter() - start, 3),
+        'results': results,
+    }
+    with open(os.path.join(output_root, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract ornaments from many sprite sheets in parallel")
+    parser.add_argument('inputs', nargs='+', help="sheet files or glob patterns (quote globs)")
+    parser.add_argument('-o', '--output-dir', default='assets/ornaments/batch',
+                        help="root folder, one sub-folder is created per sheet")
+    parser.add_argument('-s', '--strategy', choices=STRATEGIES, default='components',
+                        help="components (connected components), grid (detected grid) or gaps (gap detection)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="reuse regions from this extraction cache (components strategy)")
+    parser.add_argument('--strip-height', type=int, default=None,
+                        help="segment in strips of this many rows to bound memory, cropping from "
+                             "memory-mapped planes (components strategy)")
+    parser.add_argument('--plane-dir', default=None,
+                        help="decode sheets once into memory-mapped planes kept in this folder "
+                             "(components and gaps strategies)")
+    parser.add_argument('--png-error', type=float, default=None, metavar='DELTA_E',
+                        help="write palette-quantized PNGs when the mean delta E stays within this budget (e.g. 3)")
+    parser.add_argument('--compress-level', type=int, default=6, choices=range(10), metavar='0-9',
+                        help="zlib level of plain PNGs (1 is fastest, 9 smallest; default: 6)")
+    parser.add_argument('--trace', action='store_true',
+                        help="write per-stage timings, net traced memory and peak RSS to trace.json in each sheet's folder "
+                             "(each sheet then runs in its own worker process)")
+    args = parser.parse_args()
+
+    input_paths = expand_inputs(args.inputs)
+    if not input_paths:
+        print("Error: no input sheets found!")
+        return
+
+    print(f"Processing {len(input_paths)} sheets with the {args.strategy} strategy...")
+    print("-" * 50)
+
+    summary = run_batch(input_paths, args.output_dir, args.strategy, args.workers, args.cache_dir,
+                        args.strip_height, args.plane_dir, args.trace, args.png_error,
+                        args.compress_level)
+
+    print("-" * 50)
+    print(f"Done! Extracted {summary['ornaments']} ornaments from {summary['sheets']} sheets "
+          f"in {summary['seconds']}s ({summary['failed']} failed)")
+    print(f"Summary written to {os.path.join(args.output_dir, 'summary.json')}")
+
+if __name__ == '__main__':
+    main()
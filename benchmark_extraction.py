@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extraction strategies on synthetic sprite sheets
+Reports wall time, peak memory and throughput as JSON
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+STRATEGIES = {
+    'separate_ornaments_advanced': ('separate_ornaments', 'separate_ornaments_advanced', 'path+output'),
+    'separate_ornaments_smart': ('separate_ornaments_smart', 'separate_ornaments_smart', 'path+output'),
+    'find_content_regions': ('extract_smart', 'find_content_regions', 'path'),
+    'find_bounding_boxes': ('extract_ornaments', 'find_bounding_boxes', 'array'),
+    'find_individual_objects': ('extract_individual', 'find_individual_objects', 'array'),
+}
+
+def make_sheet(size, components, seed=0):
+    """
+    Synthetic RGBA sheet: a grid of opaque round ornaments with hooks, plus
+    small specks towards the requested component count (specks can touch
+    and merge, see count_components)
+    """
+    rng = np.random.default_rng(seed)
+    sheet = np.zeros((size, size, 4), dtype=np.uint8)
+
+    ornaments = max(1, min(components, 14))
+    cols = int(np.ceil(np.sqrt(ornaments * 2)))
+    rows = int(np.ceil(ornaments / cols))
+    cell_w = size // cols
+    cell_h = size // rows
+    radius = int(min(cell_w, cell_h) * 0.3)
+
+    yy, xx = np.ogrid[:size, :size]
+    for idx in range(ornaments):
+        cy = (idx // cols) * cell_h + cell_h // 2
+        cx = (idx % cols) * cell_w + cell_w // 2
+        top, bottom = max(0, cy - radius), min(size, cy + radius + 1)
+        left, right = max(0, cx - radius), min(size, cx + radius + 1)
+        disc = (yy[top:bottom] - cy) ** 2 + (xx[:, left:right] - cx) ** 2 <= radius ** 2
+        color = rng.integers(0, 256, 3, dtype=np.uint8)
+        sheet[top:bottom, left:right][disc] = np.append(color, 255)
+
+        # Hook on top of the ball
+        hook = max(2, radius // 8)
+        sheet[max(0, cy - radius - hook * 2):cy - radius + 1, cx - hook // 2:cx + hook // 2 + 1] = (200, 170, 40, 255)
+
+    # Specks in the gaps between cells
+    specks = max(0, components - ornaments)
+    if specks:
+        ys = rng.integers(0, size - 3, specks)
+        xs = rng.integers(0, size - 3, specks)
+        for y, x in zip(ys, xs):
+            if sheet[y:y + 3, x:x + 3, 3].any():
+                continue
+            sheet[y:y + 2, x:x + 2] = (255, 255, 255, 255)
+
+    return sheet
+
+def count_components(sheet, threshold=50):
+    """
+    Components the sheet really has, which can fall short of the count
+    make_sheet was asked for
+    """
+    from scipy import ndimage
+    return ndimage.label(sheet[:, :, 3] > threshold)[1]
+
+def run_case(strategy, sheet_path, repeats=1):
+    """
+    Time one strategy on one sheet; meant to run in a fresh process.
+
+    The repeats are timed with tracemalloc off, since tracing slows numpy and
+    PIL heavy code a lot; one extra traced pass measures the peak. max_rss is
+    the high-water mark of this process, so it covers the imports and the
+    largest of these identical runs, never another case.
+    """
+    module_name, func_name, call = STRATEGIES[strategy]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    module = __import__(module_name)
+    func = getattr(module, func_name)
+
+    def invoke(output_dir):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if call == 'array':
+                img = Image.open(sheet_path)
+                func(np.array(img.convert('RGBA')))
+            elif call == 'path':
+                func(sheet_path)
+            else:
+                func(sheet_path, output_dir)
+
+    timings = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Untimed warm-up so lazy imports are not billed to the first run
+        invoke(output_dir)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            invoke(output_dir)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        invoke(output_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        max_rss *= 1024  # kilobytes on Linux, bytes on macOS
+    return {'seconds': min(timings), 'peak_traced_bytes': peak, 'max_rss_bytes': max_rss}
+
+def run_benchmarks(sizes, component_counts, strategies, repeats=1):
+    """Run every strategy on every synthetic sheet, each case in its own process"""
+    results = []
+    with tempfile.TemporaryDirectory() as sheet_dir:
+        for size in sizes:
+            for components in component_counts:
+                sheet_path = os.path.join(sheet_dir, f"sheet-{size}-{components}.png")
+                sheet = make_sheet(size, components)
+                Image.fromarray(sheet).save(sheet_path, compress_level=1)
+                measured = count_components(sheet)
+                del sheet
+
+                for strategy in strategies:
+                    # A fresh process per case keeps its max RSS separate from earlier cases
+                    with ProcessPoolExecutor(max_workers=1) as executor:
+                        stats = executor.submit(run_case, strategy, sheet_path, repeats).result()
+                    megapixels = size * size / 1e6
+                    result = {
+                        'strategy': strategy,
+                        'width': size,
+                        'height': size,
+                        'requested_components': components,
+                        'components': measured,
+                        'seconds': round(stats['seconds'], 4),
+                        'megapixels_per_second': round(megapixels / stats['seconds'], 2),
+                        'peak_traced_bytes': stats['peak_traced_bytes'],
+                        'max_rss_bytes': stats['max_rss_bytes'],
+                    }
+                    results.append(result)
+                    print(f"{strategy:<28} {size:>6}px {measured:>6} comps "
+                          f"{result['seconds']:>9.3f}s {result['megapixels_per_second']:>9.2f} MP/s "
+                          f"{result['peak_traced_bytes'] / 2**20:>9.1f} MiB traced "
+                          f"{result['max_rss_bytes'] / 2**20:>9.1f} MiB RSS")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ornament extraction strategies")
+    parser.add_argument('--sizes', default='1024,2048,4096',
+                        help="comma separated square sheet sizes, e.g. 1024,4096,16384")
+    parser.add_argument('--components', default='14,200',
+                        help="comma separated requested component counts per sheet")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES),
+                        help="comma separated subset of: " + ', '.join(STRATEGIES))
+    parser.add_argument('--repeats', type=int, default=1, help="best-of-N timing")
+    parser.add_argument('-o', '--output', default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    component_counts = [int(c) for c in args.components.split(',')]
+    strategies = [s.strip() for s in args.strategies.split(',')]
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            parser.error(f"unknown strategy: {strategy}")
+
+    results = run_benchmarks(sizes, component_counts, strategies, args.repeats)
+    report = {
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
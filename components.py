@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Single-pass connected component statistics shared by the extraction scripts
+"""
+
+import numpy as np
+from scipy import ndimage
+
+def label_components(mask):
+    """Label connected components of a boolean mask"""
+    return ndimage.label(mask)
+
+def component_stats(labeled_array, num_features, first_pixels=False):
+    """
+    Compute bounding boxes, pixel counts and centroids for every label at once.
+
+    Instead of building a full-image mask per label, the bounding boxes come from
+    a single ndimage.find_objects pass and the pixel counts and centroids from
+    bincounts over the foreground pixels. Bounds are inclusive, like the
+    coords.min()/coords.max() values the scripts used before. With
+    first_pixels set, 'first' holds the raster index of each label's first
+    pixel (the order ndimage.label numbers components in).
+    """
+    stats = {
+        'top': np.zeros(num_features, dtype=np.int64),
+        'left': np.zeros(num_features, dtype=np.int64),
+        'bottom': np.zeros(num_features, dtype=np.int64),
+        'right': np.zeros(num_features, dtype=np.int64),
+        'pixels': np.zeros(num_features, dtype=np.int64),
+        'cy': np.zeros(num_features, dtype=np.float64),
+        'cx': np.zeros(num_features, dtype=np.float64),
+    }
+    if first_pixels:
+        stats['first'] = np.zeros(num_features, dtype=np.int64)
+    if num_features == 0:
+        return stats
+
+    # Bounding boxes (one C-level pass over the label image)
+    slices = ndimage.find_objects(labeled_array, max_label=num_features)
+    for idx, slc in enumerate(slices):
+        if slc is None:
+            continue
+        stats['top'][idx] = slc[0].start
+        stats['bottom'][idx] = slc[0].stop - 1
+        stats['left'][idx] = slc[1].start
+        stats['right'][idx] = slc[1].stop - 1
+
+    # Pixel counts and centroids, weighted bincounts over the foreground only
+    ys, xs = np.nonzero(labeled_array)
+    labels = labeled_array[ys, xs]
+    counts = np.bincount(labels, minlength=num_features + 1)[1:]
+    sum_y = np.bincount(labels, weights=ys, minlength=num_features + 1)[1:]
+    sum_x = np.bincount(labels, weights=xs, minlength=num_features + 1)[1:]
+
+    stats['pixels'] = counts.astype(np.int64)
+    stats['cy'] = sum_y / np.maximum(counts, 1)
+    stats['cx'] = sum_x / np.maximum(counts, 1)
+
+    if first_pixels:
+        # Pixels come in raster order, so a label's first pixel starts one of its runs
+        starts = np.flatnonzero(np.diff(labels, prepend=0))
+        first = np.full(num_features + 1, labeled_array.size, dtype=np.int64)
+        np.minimum.at(first, labels[starts], ys[starts] * labeled_array.shape[1] + xs[starts])
+        stats['first'] = first[1:]
+
+    return stats
+
+def find_components(mask):
+    """Label a mask and return the label image, component count and stats"""
+    labeled_array, num_features = label_components(mask)
+    return labeled_array, num_features, component_stats(labeled_array, num_features)
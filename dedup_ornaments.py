@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash deduplication of extracted ornaments
+Near-duplicate crops (from different scripts or similar sheets) are found
+with a BK-tree over 64-bit perceptual hashes and collapsed into one asset
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+from PIL import Image
+
+import manifest
+
+HASH_SIZE = 8
+HIGHFREQ_FACTOR = 4
+
+def _natural_key(path):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', os.path.basename(path))]
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis as an n x n matrix"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+_DCT = _dct_matrix(HASH_SIZE * HIGHFREQ_FACTOR)
+
+def perceptual_hash(img):
+    """
+    64-bit pHash of an ornament.
+
+    The crop is trimmed to its visible pixels and composited on mid grey, so
+    different padding or transparent margins hash the same.
+    """
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    bbox = img.getchannel('A').getbbox()
+    if bbox:
+        img = img.crop(bbox)
+
+    background = Image.new('RGBA', img.size, (128, 128, 128, 255))
+    gray = Image.alpha_composite(background, img).convert('L')
+
+    size = HASH_SIZE * HIGHFREQ_FACTOR
+    pixels = np.asarray(gray.resize((size, size), Image.LANCZOS), dtype=np.float64)
+    dct = _DCT @ pixels @ _DCT.T
+    low = dct[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low[1:] > np.median(low[1:])
+
+    value = 0
+    for bit in np.concatenate(([False], bits)):
+        value = (value << 1) | int(bit)
+    return value
+
+def mean_color(img):
+    """Average RGB of the visible pixels, weighted by alpha"""
+    pixels = np.asarray(img.convert('RGBA'), dtype=np.float64).reshape(-1, 4)
+    weights = pixels[:, 3]
+    if weights.sum() == 0:
+        return (0.0, 0.0, 0.0)
+    return tuple(float(c) for c in (pixels[:, :3] * weights[:, None]).sum(axis=0) / weights.sum())
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """BK-tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        node = [value, item, {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, max_distance):
+        """All (distance, item) within max_distance of value, closest first"""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                matches.append((distance, item))
+            # Triangle inequality: only children in [d - r, d + r] can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches, key=lambda match: match[0])
+
+def find_duplicates(paths, max_distance=6, max_color_distance=24.0):
+    """
+    Group near-duplicate images.
+
+    The pHash is computed on luminance, so a red and a green bauble of the
+    same shape collide; candidates from the BK-tree must also have a mean
+    colour within max_color_distance (RGB, 0-255).
+
+    Returns {canonical_path: [duplicate_paths]}; the canonical asset of a
+    group is its largest image (first in natural order on ties).
+    """
+    records = []
+    colors = {}
+    for path in paths:
+        with Image.open(path) as img:
+            records.append({'path': path, 'hash': perceptual_hash(img), 'area': img.size[0] * img.size[1]})
+            colors[path] = np.array(mean_color(img))
+
+    # Insert largest first so the first member of every group is its canonical
+    records.sort(key=lambda r: (-r['area'], _natural_key(r['path'])))
+    tree = BKTree()
+    groups = {}
+    for record in records:
+        color = colors[record['path']]
+        matches = [
+            item for _, item in tree.search(record['hash'], max_distance)
+            if np.linalg.norm(colors[item] - color) <= max_color_distance
+        ]
+        if matches:
+            groups[matches[0]].append(record['path'])
+        else:
+            tree.add(record['hash'], record['path'])
+            groups[record['path']] = []
+
+    return {canonical: dupes for canonical, dupes in groups.items() if dupes}
+
+def _free_target(duplicates_dir, path):
+    """
+    Where a duplicate goes: its own name, else prefixed with its folder's
+    name, else numbered until no earlier move is overwritten
+    """
+    name = os.path.basename(path)
+    parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    stem, ext = os.path.splitext(name)
+    names = itertools.chain([name, f"{parent}-{name}"], (f"{parent}-{stem}-{n}{ext}" for n in itertools.count(2)))
+    for candidate in names:
+        target = os.path.join(duplicates_dir, candidate)
+        if not os.path.exists(target):
+            return target
+
+def apply_dedup(groups, duplicates_dir):
+    """Move duplicates aside and drop them from each folder's manifest"""
+    os.makedirs(duplicates_dir, exist_ok=True)
+    moved_by_dir = {}
+    for dupes in groups.values():
+        for path in dupes:
+            shutil.move(path, _free_target(duplicates_dir, path))
+            moved_by_dir.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+
+    for folder, names in moved_by_dir.items():
+        manifest_path = os.path.join(folder, manifest.MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            continue
+        with manifest.locked(folder):
+            data = manifest.load_manifest(folder)
+            data['ornaments'] = [entry for entry in data['ornaments'] if entry['file'] not in names]
+            manifest.write_manifest(folder, data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and collapse near-duplicate ornaments")
+    parser.add_argument('inputs', nargs='*', default=['assets/ornaments/ornament-*.png'],
+                        help="ornament files or glob patterns (default: assets/ornaments/ornament-*.png)")
+    parser.add_argument('--max-distance', type=int, default=6,
+                        help="largest Hamming distance (of 64 bits) still considered a duplicate")
+    parser.add_argument('--max-color-distance', type=float, default=24.0,
+                        help="largest difference in mean RGB colour still considered a duplicate")
+    parser.add_argument('--report', default=None, help="write the duplicate groups to this JSON file")
+    parser.add_argument('--apply', action='store_true',
+                        help="move duplicates into --duplicates-dir and drop them from ornaments.json")
+    parser.add_argument('--duplicates-dir', default='assets/ornaments/duplicates')
+    args = parser.parse_args()
+
+    paths = set()
+    for pattern in args.inputs:
+        paths.update(glob.glob(pattern))
+    paths = sorted(paths, key=_natural_key)
+    if not paths:
+        print("Error: no ornament images found!")
+        return
+
+    print(f"Hashing {len(paths)} ornaments...")
+    groups = find_duplicates(paths, args.max_distance, args.max_color_distance)
+
+    duplicates = sum(len(dupes) for dupes in groups.values())
+    for canonical, dupes in groups.items():
+        print(f"{os.path.basename(canonical)} <- {', '.join(os.path.basename(d) for d in dupes)}")
+    print(f"\nFound {duplicates} duplicates in {len(groups)} groups")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(groups, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    if args.apply and groups:
+        apply_dedup(groups, args.duplicates_dir)
+        print(f"Moved {duplicates} duplicates to {args.duplicates_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -6,82 +6,348 @@ Recursively separate ornaments that contain multiple elements
 from PIL import Image
 import numpy as np
 from scipy import ndimage
+from scipy.spatial import cKDTree
 import os
+from concurrent.futures import Future
 
-def find_individual_objects(img_array, min_size=30):
-    """Find individual objects in an image using connected components"""
+import extraction_cache
+import manifest
+import plane_cache
+from components import component_stats, find_components, label_components
+from instrumentation import stage
+from ornament_writer import OrnamentWriter
+from outlines import ornament_shape
+from regions import RegionTable
+
+def find_individual_objects(img_array, min_size=30, threshold=50, padding=2, return_labels=False):
+    """
+    Find individual objects in an image using connected components
+
+    With return_labels set, returns (regions, labels) so callers can reuse
+    the label image the regions' 'label' column refers to.
+    """
     alpha_channel = img_array[:, :, 3]
     height, width = alpha_channel.shape
     
     # Create binary mask
-    mask = (alpha_channel > 50).astype(int)
+    with stage('threshold'):
+        mask = alpha_channel > threshold
     
-    # Label connected components
-    labeled_array, num_features = ndimage.label(mask)
+    # Label connected components and measure them all in one pass
+    with stage('label'):
+        labeled_array, num_features = label_components(mask)
+    with stage('bbox'):
+        stats = component_stats(labeled_array, num_features)
     
-    regions = []
+    regions = regions_from_stats(stats, width, height, min_size, padding)
+    return (regions, labeled_array) if return_labels else regions
+
+def regions_from_stats(stats, width, height, min_size=30, padding=2):
+    """Filter, pad, clip and sort component stats into a RegionTable"""
+    return RegionTable.from_stats(stats).filter(min_pixels=min_size).pad(padding).clip(width, height).sort()
+
+def split_component(mask, typical_pixels, min_piece_ratio=0.25, max_neck_ratio=0.45):
+    """
+    Split a blob of touching ornaments with a distance-transform watershed.
+
+    Seeds are the distance-transform peaks that are at least half as deep as
+    the deepest one and at least one typical ornament radius apart. The split
+    is kept only if every piece is a sizeable fraction of a typical ornament
+    and the pieces meet at necks narrower than max_neck_ratio x the shallowest
+    piece (so a bell and its bow stay together). Returns a label image over
+    mask (0 = background) and the number of pieces.
+    """
+    distance = ndimage.distance_transform_edt(mask)
+    radius = max(2, int(np.sqrt(typical_pixels / np.pi) * 0.5))
+    peaks = (distance == ndimage.maximum_filter(distance, size=2 * radius + 1)) & (distance >= 0.5 * distance.max())
+    markers, num_markers = ndimage.label(peaks)
+    if num_markers < 2:
+        return mask.astype(np.int32), 1
+
+    # Flood from the seeds level by level, deepest pixels first, so each piece
+    # grows outwards from its centre and pieces meet at the narrow necks. Each
+    # level hands every new pixel to the nearest piece in its part of the
+    # level set in one distance transform, rather than dilating ring by ring.
+    pieces = markers.astype(np.int32)
+    for level in np.linspace(distance.max(), 0, 16):
+        allowed = mask & (distance >= level)
+        parts, _ = ndimage.label(allowed)
+        reached = np.unique(parts[pieces > 0])
+        fresh = allowed & (pieces == 0) & np.isin(parts, reached[reached > 0])
+        if not fresh.any():
+            continue
+        _, (rows, cols) = ndimage.distance_transform_edt(pieces == 0, return_indices=True)
+        pieces[fresh] = pieces[rows[fresh], cols[fresh]]
+
+    # Undo the split if it produced slivers or cut through a wide join
+    sizes = np.bincount(pieces.ravel(), minlength=num_markers + 1)[1:num_markers + 1]
+    if (sizes < min_piece_ratio * typical_pixels).any():
+        return mask.astype(np.int32), 1
+    seams = (ndimage.grey_dilation(pieces, size=3) != pieces) & mask
+    depths = ndimage.maximum(distance, pieces, np.arange(1, num_markers + 1))
+    if distance[seams].max() >= max_neck_ratio * np.min(depths):
+        return mask.astype(np.int32), 1
+    return pieces, num_markers
+
+def find_ornaments_hierarchical(img_array, min_size=30, threshold=50, padding=2, split_ratio=1.8,
+                                satellite_ratio=0.15, merge_distance=40, max_depth=3):
+    """
+    Find one region per ornament, splitting touching ornaments and merging
+    detached parts (hooks, sparkles) back into them.
+
+    Components larger than split_ratio x the typical ornament are split with a
+    watershed, recursively up to max_depth. Components smaller than
+    satellite_ratio x typical are merged into the nearest ornament if one is
+    within merge_distance pixels, found with a KD-tree over ornament edges.
+    Returns (regions, labels) where labels is the final label image that the
+    regions' 'label' column refers to.
+    """
+    alpha_channel = img_array[:, :, 3]
+    height, width = alpha_channel.shape
+    mask = alpha_channel > threshold
+    labels, num_features, stats = find_components(mask)
+    if num_features == 0:
+        return RegionTable(), labels
+    
+    # Typical ornament size: the lower median, ignoring specks, so a few
+    # merged blobs do not inflate it
+    pixels = stats['pixels']
+    sizes = np.sort(pixels[pixels >= 0.1 * pixels.max()])
+    typical = float(sizes[(len(sizes) - 1) // 2])
+    
+    # Split oversized components, working inside each one's bounding box
+    next_label = num_features + 1
+    to_split = []
+    for i in np.flatnonzero(pixels > split_ratio * typical):
+        slc = (slice(stats['top'][i], stats['bottom'][i] + 1), slice(stats['left'][i], stats['right'][i] + 1))
+        to_split.append((int(i) + 1, slc, 1))
+    while to_split:
+        label, slc, depth = to_split.pop()
+        window = labels[slc]
+        pieces, count = split_component(window == label, typical)
+        if count < 2:
+            continue
+        piece_slices = ndimage.find_objects(pieces)
+        for piece in range(1, count + 1):
+            piece_mask = pieces == piece
+            piece_label = label
+            if piece > 1:
+                piece_label = next_label
+                window[piece_mask] = piece_label
+                next_label += 1
+            if depth < max_depth and piece_mask.sum() > split_ratio * typical:
+                inner = piece_slices[piece - 1]
+                piece_slc = tuple(slice(outer.start + part.start, outer.start + part.stop)
+                                  for outer, part in zip(slc, inner))
+                to_split.append((piece_label, piece_slc, depth + 1))
     
-    # Find bounding box for each component
-    for label_num in range(1, num_features + 1):
-        component_mask = (labeled_array == label_num)
-        pixels = np.sum(component_mask)
+    stats = component_stats(labels, next_label - 1)
+    pixels = stats['pixels']
+    satellites = np.flatnonzero((pixels > 0) & (pixels < satellite_ratio * typical)) + 1
+    parents = np.flatnonzero(pixels >= satellite_ratio * typical) + 1
+    
+    # Merge satellites into the nearest parent by edge-to-edge distance
+    if len(satellites) and len(parents):
+        edges = labels != ndimage.grey_erosion(labels, size=3)
+        edges &= labels > 0
+        ys, xs = np.nonzero(edges)
+        owners = labels[ys, xs]
+        is_parent = np.isin(owners, parents)
+        tree = cKDTree(np.column_stack([ys[is_parent], xs[is_parent]]))
+        parent_owner = owners[is_parent]
         
-        if pixels > min_size:
-            # Find bounding box
-            coords = np.argwhere(component_mask)
-            min_y, min_x = coords.min(axis=0)
-            max_y, max_x = coords.max(axis=0)
-            
-            # Add some padding
-            padding = 2
-            min_y = max(0, min_y - padding)
-            max_y = min(height - 1, max_y + padding)
-            min_x = max(0, min_x - padding)
-            max_x = min(width - 1, max_x + padding)
-            
-            regions.append({
-                'left': min_x,
-                'top': min_y,
-                'right': max_x + 1,
-                'bottom': max_y + 1,
-                'pixels': pixels
-            })
+        is_satellite = np.isin(owners, satellites)
+        distances, nearest = tree.query(np.column_stack([ys[is_satellite], xs[is_satellite]]),
+                                        distance_upper_bound=merge_distance)
+        sat_owner = owners[is_satellite]
+        found = np.isfinite(distances)
+        
+        # Closest parent for each satellite that has one in range
+        if found.any():
+            order = np.lexsort((distances[found], sat_owner[found]))
+            sat_sorted = sat_owner[found][order]
+            first = np.concatenate(([True], sat_sorted[1:] != sat_sorted[:-1]))
+            remap = np.arange(next_label)
+            remap[sat_sorted[first]] = parent_owner[nearest[found][order][first]]
+            labels = remap[labels]
+            stats = component_stats(labels, next_label - 1)
     
-    # Sort regions by position (top to bottom, left to right)
-    regions.sort(key=lambda r: (r['top'], r['left']))
+    regions = regions_from_stats(stats, width, height, min_size, padding)
     
-    return regions
+    return regions, labels
 
-def separate_all_ornaments(input_path, output_dir):
-    """Separate all ornaments including sub-ornaments"""
-    img = Image.open(input_path)
+def separate_all_ornaments(input_path, output_dir, min_size=100, threshold=50, padding=2, cache_dir=None,
+                           strip_height=None, hierarchical=False, plane_dir=None, outlines=False,
+                           png_error=None, compress_level=6):
+    """
+    Separate all ornaments including sub-ornaments
+
+    With cache_dir set, detected regions are cached by sheet content and
+    parameters, and nothing is rewritten while the last run's files are intact.
+    With strip_height set, the sheet is segmented in strips of that many rows
+    to bound peak memory on very large sheets; labeling reads only the
+    memory-mapped alpha plane (from plane_dir, or the default plane cache),
+    and the RGBA plane is mapped for cropping only once there are ornaments
+    to crop, instead of holding the decoded sheet; it cannot be combined with
+    hierarchical, which labels the whole sheet at once. With hierarchical
+    set, touching ornaments are split and detached hooks merged back (see
+    find_ornaments_hierarchical), and each crop keeps only its own ornament.
+    With plane_dir set, pixels come from the memory-mapped plane cache, so
+    repeated runs with different thresholds skip PNG decoding. With outlines
+    set, each manifest entry also gets a simplified outline and a bit-packed
+    hit mask, taken from the component's pixels in the label image. With
+    png_error set, crops are written as palette-quantized PNGs when that
+    stays within this mean delta E (see png_optimizer); otherwise they are
+    plain PNGs at zlib compress_level (0-9).
+    """
+    if strip_height and hierarchical:
+        raise ValueError("strip_height cannot be combined with hierarchical")
+    if strip_height and not plane_dir:
+        plane_dir = plane_cache.DEFAULT_PLANE_DIR
+    
+    key = entry = None
+    labels = None
+    if cache_dir:
+        key = extraction_cache.cache_key(input_path, strategy='components', threshold=threshold,
+                                         min_size=min_size, padding=padding, hierarchical=hierarchical,
+                                         outlines=outlines, png_error=png_error,
+                                         compress_level=compress_level)
+        entry = extraction_cache.load_entry(key, cache_dir)
+        if entry and entry['output_dir'] == os.path.abspath(output_dir) and extraction_cache.outputs_current(entry):
+            print(f"Cache hit: {len(entry['regions'])} ornaments already up to date")
+            return len(entry['regions'])
     
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
+    if strip_height:
+        # Nothing is decoded up front, labeling needs only the alpha plane
+        img = pixels = None
+        with Image.open(input_path) as header:
+            width, height = header.size
+    elif plane_dir:
+        with stage('decode'):
+            img, pixels = plane_cache.open_sheet(input_path, plane_dir)
+    else:
+        with stage('decode'):
+            img = Image.open(input_path)
+            img.load()
+        
+        with stage('convert'):
+            if img.mode != 'RGBA':
+                img = img.convert('RGBA')
+        pixels = None
     
-    width, height = img.size
-    img_array = np.array(img)
+    if img is not None:
+        width, height = img.size
     
     print(f"Image size: {width}x{height}")
-    print("Finding all individual ornaments...")
     
-    regions = find_individual_objects(img_array, min_size=100)
+    if entry and not hierarchical:
+        regions = RegionTable.from_records(entry['regions'])
+        print("Reusing cached ornament regions...")
+    else:
+        print("Finding all individual ornaments...")
+        if hierarchical:
+            with stage('convert'):
+                sheet = np.array(img) if pixels is None else pixels
+            regions, labels = find_ornaments_hierarchical(sheet, min_size=min_size, threshold=threshold,
+                                                          padding=padding)
+        elif strip_height:
+            from tiled_segmentation import find_individual_objects_tiled
+            with stage('decode'):
+                alpha = plane_cache.load_alpha(input_path, plane_dir)
+            regions = find_individual_objects_tiled(alpha, min_size=min_size, threshold=threshold,
+                                                    padding=padding, strip_height=strip_height)
+        else:
+            with stage('convert'):
+                sheet = np.array(img) if pixels is None else pixels
+            regions, labels = find_individual_objects(sheet, min_size=min_size, threshold=threshold,
+                                                      padding=padding, return_labels=True)
     
     print(f"Found {len(regions)} individual ornaments")
     
-    os.makedirs(output_dir, exist_ok=True)
+    if img is None and len(regions):
+        with stage('decode'):
+            img, _ = plane_cache.open_sheet(input_path, plane_dir)
     
-    for idx, region in enumerate(regions, 1):
-        ornament = img.crop((region['left'], region['top'], region['right'], region['bottom']))
-        
-        output_path = os.path.join(output_dir, f"ornament-{idx}.png")
-        ornament.save(output_path)
-        
-        size = ornament.size
-        print(f"Saved ornament-{idx}.png ({size[0]}x{size[1]}, {region['pixels']} pixels)")
+    entries = save_regions(img, regions, output_dir, input_path, labels=labels, hierarchical=hierarchical,
+                           outlines=outlines, threshold=threshold, png_error=png_error,
+                           compress_level=compress_level)
+    
+    if cache_dir:
+        extraction_cache.store_entry(key, {
+            'input': os.path.abspath(input_path),
+            'output_dir': os.path.abspath(output_dir),
+            'regions': regions.to_records(),
+            'outputs': extraction_cache.describe_outputs([os.path.join(output_dir, e['file']) for e in entries])
+        }, cache_dir)
     
     return len(regions)
 
+def region_mask(ornament, pixels, threshold=50):
+    """
+    Mask of a region's own component inside its crop, for cached or
+    strip-segmented regions that have no label image.
+
+    The padded crop can hold parts of neighbouring ornaments, so the crop's
+    alpha is labeled and only the component with the region's pixel count
+    is kept; the component lies wholly inside its box, so this is the same
+    mask the sheet's label image gives.
+    """
+    labeled, count = label_components(np.asarray(ornament.getchannel('A')) > threshold)
+    if count == 0:
+        return labeled > 0
+    sizes = np.bincount(labeled.ravel(), minlength=count + 1)[1:]
+    return labeled == int(np.argmin(np.abs(sizes - pixels))) + 1
+
+def save_regions(img, regions, output_dir, source_path, labels=None, hierarchical=False, outlines=False,
+                 threshold=50, png_error=None, file_names=None, unchanged=None, compress_level=6):
+    """
+    Crop, write and list every region of a components run in ornaments.json;
+    returns the manifest entries.
+
+    file_names gives each region's file (default ornament-{idx}.png).
+    unchanged(file_name, ornament) may return the sha256 of a file that
+    already holds exactly these pixels, which is then left alone.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    saved = []
+    with OrnamentWriter(compress_level=compress_level, max_error=png_error, alpha_threshold=threshold) as writer:
+        for idx, (box, region) in enumerate(zip(regions.boxes(), regions), 1):
+            with stage('crop'):
+                ornament = img.crop(box)
+            if labels is not None and hierarchical:
+                # Blank out neighbouring ornaments that overlap this box
+                alpha = np.array(ornament.getchannel('A'))
+                window = labels[box[1]:box[3], box[0]:box[2]]
+                alpha[(window != 0) & (window != region['label'])] = 0
+                ornament.putalpha(Image.fromarray(alpha))
+            
+            shape = None
+            if outlines:
+                with stage('outline'):
+                    if labels is not None:
+                        mask = labels[box[1]:box[3], box[0]:box[2]] == region['label']
+                    else:
+                        mask = region_mask(ornament, region['pixels'], threshold)
+                    shape = ornament_shape(mask)
+            
+            file_name = file_names[idx - 1] if file_names else f"ornament-{idx}.png"
+            output_path = os.path.join(output_dir, file_name)
+            sha256 = unchanged(file_name, ornament) if unchanged else None
+            if sha256:
+                written = Future()
+                written.set_result({'path': output_path, 'sha256': sha256, **manifest.crop_fields(ornament, threshold)})
+                saved.append((written, box, shape))
+                continue
+            saved.append((writer.save(ornament, output_path), box, shape))
+            
+            size = ornament.size
+            print(f"Saved {file_name} ({size[0]}x{size[1]}, {region['pixels']} pixels)")
+    
+    entries = manifest.written_entries(saved, source_path, 'components')
+    manifest.update_manifest(output_dir, source_path, 'components', entries)
+    return entries
+
 if __name__ == "__main__":
     input_image = "/Users/thiransamuthumala/xmastree/assets/ornamnents.PNG"
     output_directory = "/Users/thiransamuthumala/xmastree/assets/ornaments"
@@ -8,9 +8,18 @@ import os
 from PIL import Image
 import numpy as np
 
-def find_bounding_boxes(image_array, threshold=10):
+import extraction_cache
+import manifest
+from instrumentation import stage
+from ornament_writer import OrnamentWriter
+from regions import RegionTable
+
+def find_bounding_boxes(image_array, threshold=10, padding=5, coarse_factor=None):
     """
     Find bounding boxes of non-transparent objects in the image
+
+    With coarse_factor set, components are labeled on a reduced alpha plane
+    and refined in full-resolution windows (same result).
     """
     # Get alpha channel
     if image_array.shape[2] == 4:
@@ -25,78 +34,112 @@ def find_bounding_boxes(image_array, threshold=10):
     cols_with_content = np.where(np.any(alpha > threshold, axis=0))[0]
     
     if len(rows_with_content) == 0 or len(cols_with_content) == 0:
-        return []
+        return RegionTable()
     
     # Simple grid detection - split into equal parts
     height, width = image_array.shape[:2]
     
-    # Try to detect grid layout (assuming 4x2, 3x3, etc.)
-    boxes = []
-    
     # Attempt 1: Detect individual objects by connected components
-    from scipy import ndimage
-    labeled, num_features = ndimage.label(alpha > threshold)
-    
-    for i in range(1, num_features + 1):
-        component = (labeled == i)
-        rows = np.where(np.any(component, axis=1))[0]
-        cols = np.where(np.any(component, axis=0))[0]
-        
-        if len(rows) > 10 and len(cols) > 10:  # Minimum size filter
-            y_min, y_max = rows[0], rows[-1]
-            x_min, x_max = cols[0], cols[-1]
-            
-            # Add some padding
-            padding = 5
-            y_min = max(0, y_min - padding)
-            y_max = min(height, y_max + padding)
-            x_min = max(0, x_min - padding)
-            x_max = min(width, x_max + padding)
-            
-            boxes.append((x_min, y_min, x_max, y_max))
-    
-    return boxes
+    if coarse_factor:
+        from alpha_pyramid import coarse_components
+        with stage('label'):
+            stats = coarse_components(alpha, threshold, coarse_factor)
+    else:
+        from components import component_stats, label_components
+        with stage('threshold'):
+            mask = alpha > threshold
+        with stage('label'):
+            labeled_array, num_features = label_components(mask)
+        with stage('bbox'):
+            stats = component_stats(labeled_array, num_features)
+    
+    # Minimum size filter, then add some padding (the inclusive bottom/right
+    # bounds plus padding are used as the exclusive crop edge)
+    boxes = RegionTable.from_stats(stats).filter(min_width=10, min_height=10)
+    boxes = boxes.pad(padding)
+    boxes['right'][:] -= 1
+    boxes['bottom'][:] -= 1
+    
+    return boxes.clip(width, height)
 
-def extract_ornaments(input_path, output_dir):
+def extract_ornaments(input_path, output_dir, threshold=10, padding=5, cache_dir=None, coarse_factor=None,
+                      png_error=None, compress_level=6):
     """
     Extract individual ornaments from the input image
+
+    With cache_dir set, bounding boxes are cached by sheet content and
+    parameters, and nothing is rewritten while the last run's files are intact.
+    With png_error set, crops are palette-quantized within that mean delta E;
+    otherwise they are plain PNGs at zlib compress_level (0-9).
     """
+    key = entry = None
+    if cache_dir:
+        key = extraction_cache.cache_key(input_path, strategy='bounding-boxes', threshold=threshold,
+                                         padding=padding, png_error=png_error,
+                                         compress_level=compress_level)
+        entry = extraction_cache.load_entry(key, cache_dir)
+        if entry and entry['output_dir'] == os.path.abspath(output_dir) and extraction_cache.outputs_current(entry):
+            print(f"Cache hit: {entry['count']} ornaments already up to date")
+            return entry['count']
+    
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     
     # Load image
-    img = Image.open(input_path)
-    img_array = np.array(img)
+    with stage('decode'):
+        img = Image.open(input_path)
+        img.load()
     
     print(f"Image size: {img.size}")
     print(f"Image mode: {img.mode}")
     
     # Find bounding boxes
-    boxes = find_bounding_boxes(img_array)
+    if entry:
+        boxes = RegionTable.from_boxes(entry['boxes'])
+    else:
+        with stage('convert'):
+            image_array = np.array(img)
+        boxes = find_bounding_boxes(image_array, threshold=threshold, padding=padding, coarse_factor=coarse_factor)
     
     print(f"Found {len(boxes)} ornaments")
     
     # Extract each ornament
     extracted_count = 0
-    for idx, (x_min, y_min, x_max, y_max) in enumerate(boxes, start=1):
-        # Crop ornament
-        ornament = img.crop((x_min, y_min, x_max, y_max))
-        
-        # Check if ornament has sufficient content
-        ornament_array = np.array(ornament)
-        if ornament_array.shape[2] == 4:
-            non_transparent_pixels = np.sum(ornament_array[:, :, 3] > 10)
-            total_pixels = ornament_array.shape[0] * ornament_array.shape[1]
+    saved = []
+    with OrnamentWriter(compress_level=compress_level, max_error=png_error,
+                        alpha_threshold=threshold) as writer:
+        for idx, (x_min, y_min, x_max, y_max) in enumerate(boxes.boxes(), start=1):
+            # Crop ornament
+            with stage('crop'):
+                ornament = img.crop((x_min, y_min, x_max, y_max))
+            
+            # Check if ornament has sufficient content
+            ornament_array = np.array(ornament)
+            if ornament_array.shape[2] == 4:
+                non_transparent_pixels = np.sum(ornament_array[:, :, 3] > 10)
+                total_pixels = ornament_array.shape[0] * ornament_array.shape[1]
+                
+                # Skip if less than 5% is content
+                if non_transparent_pixels / total_pixels < 0.05:
+                    continue
             
-            # Skip if less than 5% is content
-            if non_transparent_pixels / total_pixels < 0.05:
-                continue
-        
-        # Save ornament
-        output_path = os.path.join(output_dir, f'ornament-extracted-{idx}.png')
-        ornament.save(output_path)
-        print(f"Saved: {output_path} ({ornament.size})")
-        extracted_count += 1
+            # Save ornament
+            output_path = os.path.join(output_dir, f'ornament-extracted-{idx}.png')
+            saved.append((writer.save(ornament, output_path), (x_min, y_min, x_max, y_max)))
+            print(f"Saved: {output_path} ({ornament.size})")
+            extracted_count += 1
+    
+    entries = manifest.written_entries(saved, input_path, 'bounding-boxes')
+    manifest.update_manifest(output_dir, input_path, 'bounding-boxes', entries)
+    
+    if cache_dir:
+        extraction_cache.store_entry(key, {
+            'input': os.path.abspath(input_path),
+            'output_dir': os.path.abspath(output_dir),
+            'boxes': boxes.boxes(),
+            'count': extracted_count,
+            'outputs': extraction_cache.describe_outputs([written.result()['path'] for written, _ in saved])
+        }, cache_dir)
     
     print(f"\nSuccessfully extracted {extracted_count} ornaments!")
     return extracted_count
@@ -114,13 +157,13 @@ def main():
     print("Starting ornament extraction...")
     print("-" * 50)
     
-    count = extract_ornaments(input_file, output_dir)
+    count = extract_ornaments(input_file, output_dir, cache_dir=extraction_cache.DEFAULT_CACHE_DIR)
     
     print("-" * 50)
     print(f"Done! Extracted {count} ornaments to {output_dir}/")
     print("\nNext steps:")
     print("1. Check the extracted ornaments")
-    print("2. The ornaments will automatically appear in the editor")
+    print(f"2. Load {os.path.join(output_dir, manifest.MANIFEST_NAME)} in the editor to get every ornament and its size")
 
 if __name__ == '__main__':
     main()
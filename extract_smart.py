@@ -6,38 +6,50 @@ Extract ornaments using detected gaps
 from PIL import Image
 import numpy as np
 
-def find_content_regions(input_path):
-    """Find individual ornament regions by detecting content boundaries"""
-    img = Image.open(input_path)
-    
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
+import manifest
+import plane_cache
+from instrumentation import stage
+from ornament_writer import OrnamentWriter
+from gaps import projection_profile, edge_boundaries, midpoint_boundaries
+from regions import RegionTable
+
+def find_content_regions(input_path, plane_dir=None, coarse_factor=None):
+    """
+    Find individual ornament regions by detecting content boundaries
+
+    With plane_dir set, the alpha channel is read from the memory-mapped
+    plane cache instead of decoding the sheet. With coarse_factor set, the
+    profiles are computed coarse-to-fine (same result).
+    """
+    if plane_dir:
+        with stage('decode'):
+            alpha_channel = plane_cache.load_alpha(input_path, plane_dir)
+    else:
+        with stage('decode'):
+            img = Image.open(input_path)
+            img.load()
+        
+        with stage('convert'):
+            if img.mode != 'RGBA':
+                img = img.convert('RGBA')
+            
+            img_array = np.array(img)
+            alpha_channel = img_array[:, :, 3]
     
-    width, height = img.size
-    img_array = np.array(img)
-    alpha_channel = img_array[:, :, 3]
+    return find_regions_in_alpha(alpha_channel, coarse_factor)
+
+def find_regions_in_alpha(alpha_channel, coarse_factor=None):
+    """Content regions of an already decoded alpha plane (see find_content_regions)"""
+    height, width = alpha_channel.shape
     
     # Find horizontal gaps (between rows)
     print("Finding horizontal gaps...")
-    h_gaps = []
-    for y in range(height - 1):
-        if np.sum(alpha_channel[y, :] > 50) < 10:  # Empty row
-            h_gaps.append(y)
+    with stage('threshold'):
+        row_content = projection_profile(alpha_channel, threshold=50, axis=1, coarse_factor=coarse_factor)
     
-    # Group consecutive gaps
-    h_boundaries = [0]
-    if h_gaps:
-        prev = h_gaps[0]
-        for gap in h_gaps[1:]:
-            if gap - prev > 1:  # New gap group
-                h_boundaries.append(prev)
-                h_boundaries.append(gap)
-            prev = gap
-        h_boundaries.append(h_gaps[-1])
-    h_boundaries.append(height)
+    # Group consecutive empty rows (the last row is never a gap)
+    h_boundaries = edge_boundaries(row_content[:-1], max_content=10, length=height)
     
-    # Remove duplicates and sort
-    h_boundaries = sorted(list(set(h_boundaries)))
     print(f"Horizontal boundaries: {h_boundaries}")
     
     # For each row, find vertical gaps (between columns)
@@ -54,27 +66,10 @@ def find_content_regions(input_path):
         
         # Find vertical gaps in this row
         row_region = alpha_channel[row_top:row_bottom, :]
-        col_content = np.sum(row_region > 50, axis=0)
-        
-        v_gaps = []
-        for x in range(width):
-            if col_content[x] < 5:
-                v_gaps.append(x)
+        with stage('threshold'):
+            col_content = projection_profile(row_region, threshold=50, axis=0, coarse_factor=coarse_factor)
         
-        # Group consecutive gaps
-        v_boundaries = [0]
-        if v_gaps:
-            prev = v_gaps[0]
-            gap_start = prev
-            for gap in v_gaps[1:]:
-                if gap - prev > 1:  # New gap group
-                    v_boundaries.append((gap_start + prev) // 2)
-                    gap_start = gap
-                prev = gap
-            v_boundaries.append((gap_start + prev) // 2)
-        v_boundaries.append(width)
-        
-        v_boundaries = sorted(list(set(v_boundaries)))
+        v_boundaries = midpoint_boundaries(col_content, max_content=5)
         print(f"  Vertical boundaries: {v_boundaries}")
         print(f"  Found {len(v_boundaries) - 1} ornaments in this row")
         
@@ -86,40 +81,55 @@ def find_content_regions(input_path):
             if right - left < 30:  # Skip thin columns
                 continue
             
-            all_regions.append({
-                'left': left,
-                'top': row_top,
-                'right': right,
-                'bottom': row_bottom
-            })
+            all_regions.append((left, row_top, right, row_bottom))
     
-    return all_regions
+    return RegionTable.from_boxes(all_regions)
 
-def extract_ornaments(input_path, output_dir):
-    """Extract ornaments based on detected regions"""
+def extract_ornaments(input_path, output_dir, plane_dir=None, coarse_factor=None, png_error=None,
+                      compress_level=6):
+    """
+    Extract ornaments based on detected regions (palette-quantized within
+    png_error when set, otherwise plain PNGs at zlib compress_level)
+    """
     import os
     
-    img = Image.open(input_path)
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
+    if plane_dir:
+        with stage('decode'):
+            img, _ = plane_cache.open_sheet(input_path, plane_dir)
+    else:
+        with stage('decode'):
+            img = Image.open(input_path)
+            img.load()
+        with stage('convert'):
+            if img.mode != 'RGBA':
+                img = img.convert('RGBA')
     
-    regions = find_content_regions(input_path)
+    regions = find_content_regions(input_path, plane_dir, coarse_factor)
     
     print(f"\n=== EXTRACTING {len(regions)} ORNAMENTS ===")
     
     os.makedirs(output_dir, exist_ok=True)
     
-    for idx, region in enumerate(regions, 1):
-        ornament = img.crop((region['left'], region['top'], region['right'], region['bottom']))
-        
-        # Trim transparent edges
-        bbox = ornament.getbbox()
-        if bbox:
-            ornament = ornament.crop(bbox)
-        
-        output_path = os.path.join(output_dir, f"ornament-{idx}.png")
-        ornament.save(output_path)
-        print(f"Saved ornament-{idx}.png ({ornament.size[0]}x{ornament.size[1]})")
+    saved = []
+    # Pixel counts use the same alpha threshold as the gap profiles
+    with OrnamentWriter(compress_level=compress_level, max_error=png_error, alpha_threshold=50) as writer:
+        for idx, box in enumerate(regions.boxes(), 1):
+            with stage('crop'):
+                ornament = img.crop(box)
+            
+            # Trim transparent edges
+            with stage('trim'):
+                bbox = ornament.getbbox()
+                if bbox:
+                    ornament = ornament.crop(bbox)
+                    box = (box[0] + bbox[0], box[1] + bbox[1], box[0] + bbox[2], box[1] + bbox[3])
+            
+            output_path = os.path.join(output_dir, f"ornament-{idx}.png")
+            saved.append((writer.save(ornament, output_path), box))
+            print(f"Saved ornament-{idx}.png ({ornament.size[0]}x{ornament.size[1]})")
+    
+    entries = manifest.written_entries(saved, input_path, 'gaps')
+    manifest.update_manifest(output_dir, input_path, 'gaps', entries)
     
     return len(regions)
 
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for extraction results
+Entries are keyed by the sheet bytes plus the extraction parameters
+"""
+
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = '.ornament-cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHE_VERSION = 1
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(input_path, **params):
+    """Key for a sheet and the parameters it is extracted with"""
+    digest = hashlib.sha256()
+    digest.update(file_digest(input_path).encode())
+    digest.update(json.dumps({'version': CACHE_VERSION, **params}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{key}.json")
+
+def load_entry(key, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the cached entry for key, or None on a miss"""
+    path = _entry_path(cache_dir, key)
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Touch the entry so eviction is least-recently-used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+def describe_outputs(paths):
+    """Record size and modification time of written files"""
+    outputs = []
+    for path in paths:
+        stat = os.stat(path)
+        outputs.append({'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return outputs
+
+def outputs_current(entry):
+    """True if every file the entry wrote is still on disk unchanged"""
+    for output in entry.get('outputs', []):
+        try:
+            stat = os.stat(output['path'])
+        except OSError:
+            return False
+        if stat.st_size != output['size'] or stat.st_mtime_ns != output['mtime_ns']:
+            return False
+    return True
+
+def refresh_outputs(paths, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Re-record size and modification time of files rewritten on purpose (such
+    as PNGs optimized in place), so entries that wrote them stay current and
+    the next cached run keeps the new files instead of extracting again.
+    Returns the number of entries updated.
+    """
+    changed = {os.path.abspath(path) for path in paths}
+    if not changed or not os.path.isdir(cache_dir):
+        return 0
+    updated = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        outputs = entry.get('outputs', [])
+        if not any(output['path'] in changed for output in outputs):
+            continue
+        entry['outputs'] = [
+            describe_outputs([output['path']])[0] if output['path'] in changed else output
+            for output in outputs
+        ]
+        stat = os.stat(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        # Keep the entry's place in the LRU order
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        updated += 1
+    return updated
+
+def store_entry(key, entry, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Write an entry atomically, then evict old entries beyond max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(cache_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+def evict(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, suffix='.json', keep=()):
+    """
+    Delete least-recently-used files ending in suffix until they fit in
+    max_bytes; paths in keep are counted but never deleted
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        total += stat.st_size
+        if os.path.abspath(path) not in keep:
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
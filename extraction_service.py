@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Local extraction service for the extract-ornaments page
+A small asyncio HTTP server in front of pre-warmed worker processes. Sheets
+are uploaded once and kept decoded in the workers (LRU by bytes), so
+re-running with another threshold only pays for segmentation; regions and
+PNG crops are streamed back as NDJSON while they are produced
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import contextvars
+import hashlib
+import io
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_SHEET_BYTES = 1024 * 1024 * 1024
+DEFAULT_UPLOAD_BYTES = 256 * 1024 * 1024
+MAX_UPLOAD_BYTES = 128 * 1024 * 1024
+CROP_BATCH = 8
+
+# Where the page is served from by `npm run dev` and `npm start`
+DEFAULT_ORIGINS = ('http://localhost:3000', 'http://127.0.0.1:3000',
+                   'http://localhost:8080', 'http://127.0.0.1:8080')
+
+# Query parameters each strategy accepts, with the command line defaults
+STRATEGY_PARAMS = {
+    'components': {'threshold': 50, 'min_size': 100, 'padding': 2, 'hierarchical': False},
+    'bbox': {'threshold': 10, 'padding': 5, 'coarse': None},
+    'gaps': {'coarse': None},
+}
+
+class SheetCache:
+    """Decoded RGBA sheets keyed by content hash, evicting the least recently used beyond max_bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_SHEET_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, size):
+        if key in self._items:
+            self.total_bytes -= self._items.pop(key)[1]
+        self._items[key] = (value, size)
+        self.total_bytes += size
+        # The newest entry is always kept, even when it alone is over budget
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.total_bytes -= evicted
+
+# Worker process state, set up by _warm()
+_sheets = None
+_labels = OrderedDict()
+_encoder = None
+
+def _warm(max_bytes):
+    """Worker initializer: import the extractors and run them once on a tiny sheet"""
+    global _sheets, _encoder
+    _sheets = SheetCache(max_bytes)
+    _encoder = ThreadPoolExecutor(max_workers=4)
+
+    from extract_individual import find_individual_objects, find_ornaments_hierarchical
+    from extract_ornaments import find_bounding_boxes
+    from extract_smart import find_regions_in_alpha
+    from ornament_writer import encode_png
+
+    sheet = np.zeros((64, 64, 4), dtype=np.uint8)
+    sheet[8:24, 8:24] = 255
+    with contextlib.redirect_stdout(io.StringIO()):
+        find_individual_objects(sheet)
+        find_ornaments_hierarchical(sheet)
+        find_bounding_boxes(sheet)
+        find_regions_in_alpha(sheet[:, :, 3])
+    encode_png(Image.fromarray(sheet))
+
+def _ping():
+    return True
+
+def _pixels(digest, data):
+    """A worker's decoded sheet; None when it is not cached and data was not sent"""
+    cached = _sheets.get(digest)
+    if cached is not None:
+        return cached[0]
+    if data is None:
+        return None
+    with Image.open(io.BytesIO(data)) as img:
+        pixels = np.array(img.convert('RGBA') if img.mode != 'RGBA' else img)
+    pixels.flags.writeable = False
+    # Zero-copy image over the same pixels for cropping
+    _sheets.put(digest, (pixels, Image.fromarray(pixels)), pixels.nbytes)
+    return pixels
+
+def _hierarchical_labels(digest, pixels, params):
+    """Label image of a hierarchical run, kept for the crops that follow it"""
+    from extract_individual import find_ornaments_hierarchical
+
+    key = (digest, params['threshold'], params['min_size'], params['padding'])
+    if key in _labels:
+        _labels.move_to_end(key)
+        return _labels[key]
+    regions, labels = find_ornaments_hierarchical(pixels, min_size=params['min_size'],
+                                                  threshold=params['threshold'], padding=params['padding'])
+    _labels[key] = (regions, labels)
+    # Keep the two most recently used label images
+    while len(_labels) > 2:
+        _labels.popitem(last=False)
+    return _labels[key]
+
+def load_sheet(digest, data):
+    """Worker job: decode a sheet into the worker's cache; returns its size"""
+    pixels = _pixels(digest, data)
+    if pixels is None:
+        return None
+    return {'width': pixels.shape[1], 'height': pixels.shape[0]}
+
+def find_regions(digest, data, strategy, params):
+    """
+    Worker job: regions of a cached sheet as records.
+
+    Returns None when the sheet is not cached in this worker and data was not
+    sent, so the caller can resend it.
+    """
+    started = time.perf_counter()
+    pixels = _pixels(digest, data)
+    if pixels is None:
+        return None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if strategy == 'components' and params['hierarchical']:
+            regions, _ = _hierarchical_labels(digest, pixels, params)
+        elif strategy == 'components':
+            from extract_individual import find_individual_objects
+            regions = find_individual_objects(pixels, min_size=params['min_size'], threshold=params['threshold'],
+                                              padding=params['padding'])
+        elif strategy == 'bbox':
+            from extract_ornaments import find_bounding_boxes
+            regions = find_bounding_boxes(pixels, threshold=params['threshold'], padding=params['padding'],
+                                          coarse_factor=params['coarse'])
+        else:
+            from extract_smart import find_regions_in_alpha
+            regions = find_regions_in_alpha(pixels[:, :, 3], coarse_factor=params['coarse'])
+
+    return {
+        'width': pixels.shape[1],
+        'height': pixels.shape[0],
+        'regions': regions.to_records(),
+        'seconds': round(time.perf_counter() - started, 6),
+    }
+
+def _encode_crop(img, record, labels, trim):
+    from ornament_writer import encode_png
+
+    box = (record['left'], record['top'], record['right'], record['bottom'])
+    ornament = img.crop(box)
+    if labels is not None:
+        # Blank out neighbouring ornaments that overlap this box
+        alpha = np.array(ornament.getchannel('A'))
+        window = labels[box[1]:box[3], box[0]:box[2]]
+        alpha[(window != 0) & (window != record['label'])] = 0
+        ornament.putalpha(Image.fromarray(alpha))
+    if trim:
+        bbox = ornament.getbbox()
+        if bbox:
+            ornament = ornament.crop(bbox)
+            box = (box[0] + bbox[0], box[1] + bbox[1], box[0] + bbox[2], box[1] + bbox[3])
+    return {'box': list(box), 'png': base64.b64encode(encode_png(ornament, compress_level=1)).decode('ascii')}
+
+def encode_crops(digest, data, records, strategy, params, trim):
+    """Worker job: PNG crops of region records (None when the sheet must be resent)"""
+    if _pixels(digest, data) is None:
+        return None
+    pixels, img = _sheets.get(digest)
+    labels = None
+    if strategy == 'components' and params['hierarchical']:
+        labels = _hierarchical_labels(digest, pixels, params)[1]
+    # Pillow releases the GIL while encoding, so a batch encodes in parallel
+    return list(_encoder.map(lambda record: _encode_crop(img, record, labels, trim), records))
+
+def _flag(value):
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if value.lower() in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+def parse_params(query):
+    """
+    (strategy, params, crops, trim) from request query parameters.
+
+    Raises ValueError for unknown strategies and parameters the strategy does
+    not take.
+    """
+    query = dict(query)
+    strategy = query.pop('strategy', 'components')
+    if strategy not in STRATEGY_PARAMS:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {', '.join(STRATEGY_PARAMS)}")
+    query.pop('sheet', None)
+    crops = _flag(query.pop('crops', '1'))
+    trim = _flag(query.pop('trim', '1' if strategy == 'gaps' else '0'))
+
+    params = dict(STRATEGY_PARAMS[strategy])
+    for name, value in query.items():
+        name = name.replace('-', '_')
+        if name not in params:
+            raise ValueError(f"Strategy {strategy!r} does not take {name!r}")
+        params[name] = _flag(value) if name == 'hierarchical' else int(value)
+    if params.get('coarse') is not None and (params['coarse'] < 1 or params['coarse'] & (params['coarse'] - 1)):
+        raise ValueError(f"coarse must be a power of two: {params['coarse']}")
+    return strategy, params, crops, trim
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Vary': 'Origin',
+}
+
+# Allowed Origin of the request being answered (one asyncio task per connection)
+_origin = contextvars.ContextVar('origin', default=None)
+
+class ExtractionService:
+    """
+    Routes requests to warm single-process pools.
+
+    A sheet always goes to the same worker (by its hash), so its decoded
+    pixels stay in that worker's cache; different sheets run in parallel. The
+    uploaded bytes are kept here too, so a worker that evicted a sheet can be
+    sent it again without a new upload. Browsers may only call it from the
+    given origins; requests without an Origin header (curl, scripts) are served.
+    """
+
+    def __init__(self, workers=2, sheet_bytes=DEFAULT_SHEET_BYTES, upload_bytes=DEFAULT_UPLOAD_BYTES,
+                 origins=DEFAULT_ORIGINS):
+        self.origins = set(origins)
+        self.pools = [
+            ProcessPoolExecutor(max_workers=1, initializer=_warm, initargs=(sheet_bytes // workers,))
+            for _ in range(workers)
+        ]
+        self.uploads = SheetCache(upload_bytes)
+
+    def warm(self):
+        """Start every worker now instead of on its first request"""
+        for future in [pool.submit(_ping) for pool in self.pools]:
+            future.result()
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _pool(self, digest):
+        return self.pools[int(digest[:8], 16) % len(self.pools)]
+
+    def add_upload(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        self.uploads.put(digest, data, len(data))
+        return digest
+
+    async def call(self, digest, job, *args):
+        """Run a worker job for a sheet, resending the sheet if the worker no longer has it"""
+        loop = asyncio.get_running_loop()
+        pool = self._pool(digest)
+        result = await loop.run_in_executor(pool, job, digest, None, *args)
+        if result is None:
+            data = self.uploads.get(digest)
+            if data is None:
+                raise HTTPError(409, f"Sheet {digest} is not loaded, upload it again")
+            result = await loop.run_in_executor(pool, job, digest, data, *args)
+        return result
+
+    async def handle(self, reader, writer):
+        """Serve one request per connection"""
+        try:
+            method, target, headers, body = await read_request(reader)
+            origin = headers.get('origin')
+            if origin is not None:
+                if origin not in self.origins:
+                    raise HTTPError(403, f"Origin {origin} is not allowed, start the service with --allow-origin")
+                _origin.set(origin)
+            url = urlsplit(target)
+            query = parse_qsl(url.query, keep_blank_values=True)
+            if method == 'OPTIONS':
+                await send(writer, 204, b'')
+            elif url.path == '/health' and method == 'GET':
+                await send_json(writer, 200, {'status': 'ok', 'workers': len(self.pools),
+                                              'sheets': len(self.uploads)})
+            elif url.path == '/sheets' and method == 'POST':
+                await self.upload(writer, body)
+            elif url.path == '/extract' and method == 'POST':
+                await self.extract(writer, dict(query), body)
+            elif url.path in ('/health', '/sheets', '/extract'):
+                raise HTTPError(405, f"{method} is not allowed on {url.path}")
+            else:
+                raise HTTPError(404, f"No such endpoint: {url.path}")
+        except HTTPError as e:
+            await send_json(writer, e.status, {'error': str(e)})
+        except ValueError as e:
+            await send_json(writer, 400, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await send_json(writer, 500, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def upload(self, writer, body):
+        if not body:
+            raise HTTPError(400, "Upload the sheet as the request body")
+        digest = self.add_upload(body)
+        try:
+            size = await self.call(digest, load_sheet)
+        except Image.UnidentifiedImageError:
+            raise HTTPError(400, "The upload is not an image")
+        await send_json(writer, 200, {'sheet': digest, **size})
+
+    async def extract(self, writer, query, body):
+        """
+        Stream one extraction as NDJSON lines: 'sheet', 'regions', one 'crop'
+        per region (unless crops=0) and 'done', or 'error' if it fails midway.
+        """
+        started = time.perf_counter()
+        strategy, params, crops, trim = parse_params(query)
+        if body:
+            digest = self.add_upload(body)
+        elif query.get('sheet'):
+            digest = query['sheet']
+        else:
+            raise HTTPError(400, "Send the sheet as the body or pass sheet=<id> from /sheets")
+
+        try:
+            found = await self.call(digest, find_regions, strategy, params)
+        except Image.UnidentifiedImageError:
+            raise HTTPError(400, "The upload is not an image")
+        records = found.pop('regions')
+
+        await start_stream(writer)
+        await send_line(writer, {'type': 'sheet', 'sheet': digest, 'width': found['width'],
+                                 'height': found['height']})
+        await send_line(writer, {'type': 'regions', 'strategy': strategy, 'params': params, 'regions': records,
+                                 'seconds': found['seconds']})
+
+        batches = []
+        try:
+            if crops:
+                # Every batch is queued at once; the worker runs them in order
+                batches = [
+                    asyncio.ensure_future(self.call(digest, encode_crops, records[start:start + CROP_BATCH],
+                                                    strategy, params, trim))
+                    for start in range(0, len(records), CROP_BATCH)
+                ]
+                for start, batch in zip(range(0, len(records), CROP_BATCH), batches):
+                    for index, crop in enumerate(await batch, start + 1):
+                        await send_line(writer, {'type': 'crop', 'index': index, **crop})
+            await send_line(writer, {'type': 'done', 'count': len(records),
+                                     'seconds': round(time.perf_counter() - started, 6)})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            await send_line(writer, {'type': 'error', 'error': f"{type(e).__name__}: {e}"})
+        finally:
+            for batch in batches:
+                batch.cancel()
+            await asyncio.gather(*batches, return_exceptions=True)
+        await end_stream(writer)
+
+async def read_request(reader):
+    """(method, target, headers, body) of one HTTP/1.1 request"""
+    request_line = await reader.readline()
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(400, "Malformed request line")
+    method, target, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    if length > MAX_UPLOAD_BYTES:
+        raise HTTPError(413, f"Uploads are limited to {MAX_UPLOAD_BYTES // 2**20} MiB")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    origin = _origin.get()
+    if origin:
+        headers = {'Access-Control-Allow-Origin': origin, **CORS_HEADERS, **headers}
+    lines += [f"{name}: {value}" for name, value in {**headers, 'Connection': 'close'}.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+async def send(writer, status, body, content_type='application/json'):
+    writer.write(_head(status, {'Content-Type': content_type, 'Content-Length': len(body)}) + body)
+    await writer.drain()
+
+async def send_json(writer, status, payload):
+    with contextlib.suppress(ConnectionError):
+        await send(writer, status, json.dumps(payload).encode())
+
+async def start_stream(writer):
+    writer.write(_head(200, {'Content-Type': 'application/x-ndjson', 'Transfer-Encoding': 'chunked',
+                             'Cache-Control': 'no-store'}))
+    await writer.drain()
+
+async def send_line(writer, payload):
+    """Write one NDJSON line as its own chunk, so the browser sees it right away"""
+    data = json.dumps(payload).encode() + b'\n'
+    writer.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+    await writer.drain()
+
+async def end_stream(writer):
+    writer.write(b'0\r\n\r\n')
+    await writer.drain()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=2, sheet_bytes=DEFAULT_SHEET_BYTES,
+                origins=DEFAULT_ORIGINS):
+    service = ExtractionService(workers, sheet_bytes, origins=origins)
+    print(f"Warming {workers} workers...")
+    await asyncio.get_running_loop().run_in_executor(None, service.warm)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Extraction service on http://{host}:{port} (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ornament extraction to the extract-ornaments page")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=2, help="worker processes (one sheet is served by one)")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_SHEET_BYTES // 2**20,
+                        help="decoded sheets kept in memory across all workers, in MiB")
+    parser.add_argument('--allow-origin', action='append', default=None, metavar='ORIGIN',
+                        help="page origin allowed to call the service, repeatable "
+                             f"(default: {', '.join(DEFAULT_ORIGINS)})")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_mb * 2**20,
+                          args.allow_origin or DEFAULT_ORIGINS))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Vectorized row/column gap detection for ornament sheets
+"""
+
+import numpy as np
+
+def projection_profile(alpha_channel, threshold=50, axis=1, coarse_factor=None):
+    """
+    Count pixels above threshold along each row (axis=1) or column (axis=0)
+    with a single reduction over the whole alpha channel
+
+    With coarse_factor set, the same counts are computed coarse-to-fine,
+    skipping blocks that are empty on the reduced alpha plane.
+    """
+    if coarse_factor:
+        from alpha_pyramid import coarse_profile
+        return coarse_profile(alpha_channel, threshold, axis, coarse_factor)
+    return np.count_nonzero(alpha_channel > threshold, axis=axis)
+
+def gap_runs(profile, max_content):
+    """
+    Find runs of consecutive entries whose count is below max_content.
+
+    Returns two arrays with the inclusive start and end index of each run.
+    """
+    empty = np.asarray(profile) < max_content
+    edges = np.diff(np.concatenate(([0], empty.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return starts, ends
+
+def interior_gaps(profile, max_content=10):
+    """
+    Gaps that sit between two lines with content, as (start, end) pairs where
+    end is the first line with content after the gap
+    """
+    starts, ends = gap_runs(profile, max_content)
+    length = len(profile)
+    keep = (starts > 0) & (ends < length - 1)
+    return [(int(s), int(e) + 1) for s, e in zip(starts[keep], ends[keep])]
+
+def edge_boundaries(profile, max_content=10, length=None):
+    """
+    Split points at the edges of gap runs: 0, the end of every gap run, the
+    start of every gap run after the first one, and length (defaults to the
+    profile length)
+    """
+    starts, ends = gap_runs(profile, max_content)
+    boundaries = {0, len(profile) if length is None else length}
+    boundaries.update(int(e) for e in ends)
+    boundaries.update(int(s) for s in starts[1:])
+    return sorted(boundaries)
+
+def midpoint_boundaries(profile, max_content=5):
+    """Split points at the middle of every gap run, plus 0 and the profile length"""
+    starts, ends = gap_runs(profile, max_content)
+    boundaries = {0, len(profile)}
+    boundaries.update(int(m) for m in (starts + ends) // 2)
+    return sorted(boundaries)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Automatic grid detection for ornament sheets
+Estimates row/column pitch from the autocorrelation of the alpha projection
+profiles and places cell edges in the emptiest phase of the pitch
+"""
+
+import numpy as np
+
+def autocorrelation(profile):
+    """Normalized autocorrelation of a 1D profile via FFT (lag 0 == 1)"""
+    values = np.asarray(profile, dtype=np.float64)
+    values = values - values.mean()
+    n = len(values)
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    spectrum = np.fft.rfft(values, size)
+    ac = np.fft.irfft(spectrum * np.conj(spectrum), size)[:n]
+    if ac[0] <= 0:
+        return np.zeros(n)
+    return ac / ac[0]
+
+def estimate_pitch(profile, min_pitch=16, min_peak=0.1):
+    """
+    Repeat distance of a projection profile in pixels, or None if the profile
+    has no clear periodicity.
+
+    Takes the first autocorrelation peak at least half as strong as the
+    strongest one, refined to sub-pixel precision with a parabola fit.
+    """
+    ac = autocorrelation(profile)
+    n = len(ac)
+    if n < 2 * min_pitch:
+        return None
+
+    # Local maxima past min_pitch, ignoring the tail where overlap is tiny
+    lags = np.arange(max(1, min_pitch), n - min_pitch)
+    is_peak = (ac[lags] > ac[lags - 1]) & (ac[lags] >= ac[lags + 1]) & (ac[lags] > min_peak)
+    peaks = lags[is_peak]
+    if len(peaks) == 0:
+        return None
+
+    best = ac[peaks].max()
+    lag = int(peaks[np.argmax(ac[peaks] >= 0.5 * best)])
+
+    # Parabolic interpolation around the peak
+    left, center, right = ac[lag - 1], ac[lag], ac[lag + 1]
+    denom = left - 2 * center + right
+    shift = 0.5 * (left - right) / denom if denom != 0 else 0.0
+    return lag + float(np.clip(shift, -0.5, 0.5))
+
+def estimate_offset(profile, pitch):
+    """Phase (0 <= offset < pitch) where content is lowest when folded by pitch"""
+    values = np.asarray(profile, dtype=np.float64)
+    bins = max(1, int(round(pitch)))
+    phase = np.floor((np.arange(len(values)) % pitch) / pitch * bins).astype(np.int64)
+    folded = np.bincount(phase, weights=values, minlength=bins)[:bins]
+
+    # Middle of the widest run of minimal bins, so edges land mid-gap
+    low = folded <= folded.min() + 1e-9
+    doubled = np.concatenate([low, low])
+    edges = np.diff(np.concatenate(([0], doubled.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    longest = np.argmax(np.minimum(ends - starts, bins))
+    center = (starts[longest] + min(ends[longest] - starts[longest], bins) / 2.0) % bins
+    return center / bins * pitch
+
+def cell_edges(profile, min_pitch=16, min_content=0.01):
+    """
+    Cell boundaries along one axis: 0, the middle of each periodic gap, and the
+    profile length. Cells holding less than min_content of the total content
+    (empty margins) are merged away.
+    """
+    values = np.asarray(profile, dtype=np.float64)
+    n = len(values)
+    pitch = estimate_pitch(values, min_pitch)
+    if pitch is None:
+        return [0, n], None, None
+
+    offset = estimate_offset(values, pitch)
+    inner = np.arange(offset, n, pitch)
+    inner = np.round(inner[(inner > 0) & (inner < n)]).astype(np.int64)
+    edges = [0] + sorted(set(inner.tolist())) + [n]
+
+    # Drop (near) empty cells at the margins by removing their inner edge
+    total = values.sum()
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    while len(edges) > 2 and cumulative[edges[1]] - cumulative[edges[0]] < min_content * total:
+        edges.pop(1)
+    while len(edges) > 2 and cumulative[edges[-1]] - cumulative[edges[-2]] < min_content * total:
+        edges.pop(-2)
+
+    return edges, pitch, offset
+
+def detect_grid(alpha_channel, threshold=50, min_pitch=16):
+    """
+    Detect the ornament grid of a sheet from its alpha channel.
+
+    Both projection profiles come from one thresholded pass over the alpha
+    channel. Returns rows, cols, pitches, offsets and the cell edges along
+    each axis.
+    """
+    mask = np.asarray(alpha_channel) > threshold
+    row_profile = np.count_nonzero(mask, axis=1)
+    col_profile = np.count_nonzero(mask, axis=0)
+
+    row_edges, row_pitch, row_offset = cell_edges(row_profile, min_pitch)
+    col_edges, col_pitch, col_offset = cell_edges(col_profile, min_pitch)
+
+    return {
+        'rows': len(row_edges) - 1,
+        'cols': len(col_edges) - 1,
+        'row_pitch': row_pitch,
+        'col_pitch': col_pitch,
+        'row_offset': row_offset,
+        'col_offset': col_offset,
+        'row_edges': row_edges,
+        'col_edges': col_edges,
+    }
+
+def detect_grid_for_image(img, threshold=50, min_pitch=16):
+    """detect_grid for a PIL image (images without alpha count as all content)"""
+    if 'A' in img.getbands():
+        alpha = np.asarray(img.getchannel('A'))
+    else:
+        alpha = np.full((img.size[1], img.size[0]), 255, dtype=np.uint8)
+    return detect_grid(alpha, threshold, min_pitch)
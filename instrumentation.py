@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Opt-in stage timing for the extraction scripts
+Scripts wrap their stages in stage('name'); nothing is measured unless a
+run is being traced with trace_run(), which then writes a JSON trace and
+optionally a cProfile dump
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+STAGES = ('decode', 'convert', 'threshold', 'grid', 'label', 'bbox', 'crop', 'trim', 'outline', 'encode', 'write')
+
+_tracer = None
+
+class Tracer:
+    """
+    Per-stage call counts, time and net traced bytes.
+
+    net_traced_bytes is how much tracemalloc's process-wide traced memory
+    grew across each call, not a count of the stage's own allocations:
+    memory freed inside the stage offsets it, and anything the writer's
+    worker threads allocate or free meanwhile is included. Stages running on
+    worker threads (encode, write) add up their own time, so their totals
+    can exceed the run's wall time.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, name, start, seconds, net_traced):
+        with self._lock:
+            totals = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'net_traced_bytes': 0})
+            totals['calls'] += 1
+            totals['seconds'] += seconds
+            totals['net_traced_bytes'] += net_traced
+            self.events.append({
+                'stage': name,
+                'start': round(start - self.started, 6),
+                'seconds': round(seconds, 6),
+                'thread': threading.current_thread().name,
+            })
+
+class _Stage:
+    __slots__ = ('name', 'start', 'memory')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        tracer = _tracer
+        self.memory = tracemalloc.get_traced_memory()[0] if tracer and tracer.memory else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        tracer = _tracer
+        if tracer is not None:
+            seconds = time.perf_counter() - self.start
+            net_traced = tracemalloc.get_traced_memory()[0] - self.memory if tracer.memory else 0
+            tracer.record(self.name, self.start, seconds, net_traced)
+        return False
+
+def stage(name):
+    """Context manager timing one stage; a no-op unless a run is traced"""
+    if _tracer is None:
+        return contextlib.nullcontext()
+    return _Stage(name)
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+@contextlib.contextmanager
+def trace_run(name, trace_path=None, profile_path=None, memory=True, **info):
+    """
+    Trace everything inside the block as one run.
+
+    On exit a JSON trace (stage totals, per-call events, wall time, peak RSS
+    and peak traced memory) is written to trace_path and, with profile_path
+    set, a cProfile dump readable with pstats. info is copied into the trace,
+    e.g. strategy and input. Yields the Tracer.
+    """
+    global _tracer
+    if _tracer is not None:
+        raise RuntimeError("A traced run is already active")
+
+    started_tracemalloc = memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracer = _tracer = Tracer(memory)
+    profiler = cProfile.Profile() if profile_path else None
+    error = None
+    if profiler:
+        profiler.enable()
+    try:
+        yield tracer
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - tracer.started
+        traced_peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if started_tracemalloc:
+            tracemalloc.stop()
+        _tracer = None
+
+        trace = {
+            'run': name,
+            **info,
+            'wall_seconds': round(wall, 6),
+            'peak_rss_bytes': _peak_rss_bytes(),
+            'traced_peak_bytes': traced_peak,
+            'error': error,
+            'stages': {
+                stage_name: {**totals, 'seconds': round(totals['seconds'], 6)}
+                for stage_name, totals in sorted(tracer.stages.items(),
+                                                 key=lambda item: STAGES.index(item[0])
+                                                 if item[0] in STAGES else len(STAGES))
+            },
+            'events': tracer.events,
+        }
+        if trace_path:
+            directory = os.path.dirname(trace_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(trace_path, 'w') as f:
+                json.dump(trace, f, indent=2)
+        if profiler:
+            profiler.dump_stats(profile_path)
+        tracer.trace = trace
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Machine-readable ornament manifest shared by all extractors
+Each output folder gets an ornaments.json listing every extracted file with
+its bounding box in the source sheet, size, pixel count and content hash
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are not locked
+    fcntl = None
+
+MANIFEST_NAME = 'ornaments.json'
+MANIFEST_VERSION = 1
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+def crop_fields(ornament, threshold=0):
+    """
+    Manifest fields that come from a crop's pixels: 'width', 'height',
+    'pixels' (pixels with alpha above threshold, the extractor's alpha
+    threshold) and 'alpha_threshold'
+    """
+    if 'A' in ornament.getbands():
+        pixels = sum(ornament.getchannel('A').histogram()[threshold + 1:])
+    else:
+        pixels = ornament.size[0] * ornament.size[1]
+    return {'width': ornament.size[0], 'height': ornament.size[1], 'pixels': pixels, 'alpha_threshold': threshold}
+
+def _entry(output_path, fields, box, source_path, strategy, sha256, shape, png_mode=None):
+    left, top, right, bottom = (int(v) for v in box)
+    entry = {
+        'file': os.path.basename(output_path),
+        'source': os.path.basename(source_path),
+        'strategy': strategy,
+        'bbox': {'left': left, 'top': top, 'right': right, 'bottom': bottom},
+        'width': fields['width'],
+        'height': fields['height'],
+        'pixels': fields['pixels'],
+        'alpha_threshold': fields['alpha_threshold'],
+        'sha256': sha256
+    }
+    if png_mode:
+        entry['png_mode'] = png_mode
+    if shape:
+        entry.update(shape)
+    return entry
+
+def describe_ornament(output_path, ornament, box, source_path, strategy, sha256=None, shape=None, threshold=0):
+    """
+    Manifest entry for a crop that was just saved to output_path.
+
+    box is (left, top, right, bottom) of the saved pixels in the source sheet.
+    sha256 is read back from the file unless the writer already knows it.
+    shape (outlines.ornament_shape) adds 'outline' and 'hit_mask' in crop
+    coordinates. threshold is the extractor's alpha threshold (see crop_fields).
+    """
+    if sha256 is None:
+        with open(output_path, 'rb') as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+    return _entry(output_path, crop_fields(ornament, threshold), box, source_path, strategy, sha256, shape)
+
+def written_entries(saved, source_path, strategy):
+    """
+    Manifest entries for crops queued on an OrnamentWriter.
+
+    saved holds (future, box) or (future, box, shape) tuples; each future's
+    result already carries the crop fields and hash, so the crops themselves
+    need not be kept around. Crops written with a PNG error budget also get
+    'png_mode' (see png_optimizer.optimize_png). Re-raises the first failed
+    write.
+    """
+    entries = []
+    for written, box, *shape in saved:
+        result = written.result()
+        entries.append(_entry(result['path'], result, box, source_path, strategy, result['sha256'],
+                              shape[0] if shape else None, result.get('mode')))
+    return entries
+
+def load_manifest(output_dir):
+    """Read the manifest in output_dir, or an empty one"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('version', MANIFEST_VERSION)
+    manifest.setdefault('ornaments', [])
+    return manifest
+
+@contextlib.contextmanager
+def locked(output_dir):
+    """
+    Hold an exclusive lock on output_dir's manifest, so concurrent runs that
+    read, change and write it back (batch, watch, dedup, png_optimizer) do
+    not drop each other's entries
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(output_dir, f".{MANIFEST_NAME}.lock"), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def update_manifest(output_dir, source_path, strategy, entries):
+    """
+    Replace the entries a previous run of this sheet and strategy wrote, keep
+    everything else, and write the manifest atomically under its lock
+    """
+    source = os.path.basename(source_path)
+    written = {entry['file'] for entry in entries}
+
+    with locked(output_dir):
+        manifest = load_manifest(output_dir)
+        kept = [
+            entry for entry in manifest['ornaments']
+            if not (entry.get('source') == source and entry.get('strategy') == strategy)
+            and entry['file'] not in written
+        ]
+        manifest['ornaments'] = sorted(kept + list(entries), key=lambda entry: _natural_key(entry['file']))
+        return write_manifest(output_dir, manifest)
+
+def write_manifest(output_dir, manifest):
+    """Write a manifest to output_dir atomically and return its path"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unified ornament command line
+Subcommands load their strategy module on demand, so quick runs like
+analyze and grid never import scipy
+"""
+
+import argparse
+import importlib
+import sys
+
+import instrumentation
+
+# Subcommand -> (module, function); modules are imported only when used
+STRATEGIES = {
+    'analyze': ('analyze_ornaments', 'analyze_image_structure'),
+    'grid': ('separate_ornaments_smart', 'separate_ornaments_smart'),
+    'grid-raw': ('separate_ornaments', 'separate_ornaments_advanced'),
+    'gaps': ('extract_smart', 'extract_ornaments'),
+    'components': ('extract_individual', 'separate_all_ornaments'),
+    'sweep': ('threshold_sweep', 'sweep_sheet'),
+}
+
+def load_strategy(name):
+    """Import a strategy's module and return its entry point"""
+    module_name, func_name = STRATEGIES[name]
+    return getattr(importlib.import_module(module_name), func_name)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analyze sprite sheets and extract ornaments")
+    parser.add_argument('--trace', default=None,
+                        help="write per-stage timings, net traced memory and peak RSS of this run to a JSON file")
+    parser.add_argument('--profile', default=None, help="write a cProfile dump of this run (read with pstats)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze = subparsers.add_parser('analyze', help="print the row/column gap structure of a sheet")
+    analyze.add_argument('input')
+
+    grid = subparsers.add_parser('grid', help="cut along the detected grid and trim transparent edges")
+    grid.add_argument('--no-trim', action='store_true', help="keep the raw grid cells")
+
+    gaps = subparsers.add_parser('gaps', help="cut along detected empty rows and columns")
+
+    components = subparsers.add_parser('components', help="one file per connected component")
+    components.add_argument('--min-size', type=int, default=100, help="smallest component in pixels")
+    components.add_argument('--threshold', type=int, default=50, help="alpha threshold")
+    components.add_argument('--padding', type=int, default=2)
+    components.add_argument('--cache-dir', default=None, help="reuse regions from this extraction cache")
+    components.add_argument('--strip-height', type=int, default=None,
+                            help="segment in strips of this many rows to bound memory, cropping from "
+                                 "memory-mapped planes (not with --hierarchical)")
+    components.add_argument('--hierarchical', action='store_true',
+                            help="split touching ornaments and merge detached hooks back into them")
+    components.add_argument('--outlines', action='store_true',
+                            help="add simplified outlines and bit-packed hit masks to ornaments.json")
+
+    sweep = subparsers.add_parser('sweep', help="count components for several thresholds and minimum sizes")
+    sweep.add_argument('input')
+    sweep.add_argument('--thresholds', default='10,50,128', help="comma-separated alpha thresholds")
+    sweep.add_argument('--min-sizes', default='30,100', help="comma-separated minimum sizes in pixels")
+
+    for sub in (grid, gaps, components):
+        sub.add_argument('input')
+        sub.add_argument('-o', '--output-dir', default='assets/ornaments')
+
+    for sub in (grid, gaps, components):
+        sub.add_argument('--png-error', type=float, default=None, metavar='DELTA_E',
+                         help="write palette-quantized PNGs when the mean delta E stays within this budget "
+                              "(e.g. 3; default: plain 32-bit PNGs)")
+        sub.add_argument('--compress-level', type=int, default=6, choices=range(10), metavar='0-9',
+                         help="zlib level of plain PNGs (1 is fastest, 9 smallest; default: 6)")
+
+    for sub in (analyze, gaps):
+        sub.add_argument('--coarse', type=int, default=None, metavar='FACTOR',
+                         help="find gaps coarse-to-fine on a FACTOR times reduced alpha plane (power of two)")
+
+    for sub in (analyze, gaps, components, sweep):
+        sub.add_argument('--plane-dir', default=None,
+                         help="decode the sheet once into memory-mapped planes kept in this folder")
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.trace or args.profile):
+        return run(args)
+
+    with instrumentation.trace_run(args.command, args.trace, args.profile, input=args.input) as tracer:
+        status = run(args)
+    print_stages(tracer.trace)
+    return status
+
+def print_stages(trace):
+    """Short per-stage summary of a trace"""
+    print(f"\nTimings ({trace['wall_seconds']:.3f}s wall, {trace['peak_rss_bytes'] / 2**20:.1f} MiB peak RSS):")
+    for name, totals in trace['stages'].items():
+        print(f"  {name:<10} {totals['seconds']:8.3f}s  {totals['calls']:>5} calls  "
+              f"{totals['net_traced_bytes'] / 2**20:8.1f} MiB net traced")
+
+def run(args):
+    """Run the parsed subcommand"""
+    if args.command == 'analyze':
+        load_strategy('analyze')(args.input, plane_dir=args.plane_dir, coarse_factor=args.coarse)
+        return 0
+
+    if args.command == 'sweep':
+        from threshold_sweep import print_sweep
+        print_sweep(load_strategy('sweep')(
+            args.input,
+            thresholds=[int(t) for t in args.thresholds.split(',')],
+            min_sizes=[int(m) for m in args.min_sizes.split(',')],
+            plane_dir=args.plane_dir
+        ))
+        return 0
+
+    if args.command == 'grid':
+        count = load_strategy('grid-raw' if args.no_trim else 'grid')(args.input, args.output_dir,
+                                                                      png_error=args.png_error,
+                                                                      compress_level=args.compress_level)
+    elif args.command == 'gaps':
+        count = load_strategy('gaps')(args.input, args.output_dir, plane_dir=args.plane_dir,
+                                      coarse_factor=args.coarse, png_error=args.png_error,
+                                      compress_level=args.compress_level)
+    else:
+        count = load_strategy('components')(
+            args.input, args.output_dir,
+            min_size=args.min_size,
+            threshold=args.threshold,
+            padding=args.padding,
+            cache_dir=args.cache_dir,
+            strip_height=args.strip_height,
+            hierarchical=args.hierarchical,
+            plane_dir=args.plane_dir,
+            outlines=args.outlines,
+            png_error=args.png_error,
+            compress_level=args.compress_level
+        )
+
+    print(f"\n✓ Extracted {count} ornaments to {args.output_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Generate multi-resolution PNG/WebP variants of extracted ornaments
+Every crop is resized to each configured size and encoded in parallel
+"""
+
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, features
+
+DEFAULT_SIZES = '2x=1,1x=0.5,thumb=128px'
+DEFAULT_FORMATS = 'png,webp'
+
+# Encoder settings tuned for small flat-colour sprites with alpha
+SAVE_OPTIONS = {
+    'png': {'format': 'PNG', 'optimize': True, 'compress_level': 9},
+    'webp': {'format': 'WEBP', 'quality': 85, 'alpha_quality': 90, 'method': 6},
+    'avif': {'format': 'AVIF', 'quality': 70, 'speed': 4},
+}
+
+def parse_sizes(spec):
+    """
+    Parse 'name=scale,...' where scale is a factor (0.5) or a maximum side in
+    pixels (128px)
+    """
+    sizes = []
+    for item in spec.split(','):
+        name, _, value = item.strip().partition('=')
+        if not name or not value:
+            raise ValueError(f"Bad size spec: {item!r} (expected name=0.5 or name=128px)")
+        if value.endswith('px'):
+            sizes.append((name, 'px', int(value[:-2])))
+        else:
+            sizes.append((name, 'scale', float(value)))
+    return sizes
+
+def parse_formats(spec):
+    """Parse 'png,webp,avif', dropping formats this Pillow build cannot write"""
+    formats = []
+    for fmt in spec.split(','):
+        fmt = fmt.strip().lower()
+        if fmt not in SAVE_OPTIONS:
+            raise ValueError(f"Unknown format: {fmt}")
+        if fmt != 'png' and not features.check(fmt):
+            print(f"Warning: Pillow has no {fmt} support, skipping")
+            continue
+        formats.append(fmt)
+    return formats
+
+def target_size(size, kind, value):
+    """Output dimensions for one size spec, never upscaling"""
+    width, height = size
+    if kind == 'px':
+        factor = min(1.0, value / max(width, height))
+    else:
+        factor = min(1.0, value)
+    return max(1, round(width * factor)), max(1, round(height * factor))
+
+def make_variants(input_path, output_dir, sizes, formats):
+    """Resize and encode one ornament, returning a record of every file written"""
+    img = Image.open(input_path)
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    record = {
+        'source': os.path.basename(input_path),
+        'width': img.size[0],
+        'height': img.size[1],
+        'bytes': os.path.getsize(input_path),
+        'variants': []
+    }
+
+    for name, kind, value in sizes:
+        size = target_size(img.size, kind, value)
+        resized = img if size == img.size else img.resize(size, Image.LANCZOS)
+        for fmt in formats:
+            file_name = f"{stem}@{name}.{fmt}"
+            output_path = os.path.join(output_dir, file_name)
+            resized.save(output_path, **SAVE_OPTIONS[fmt])
+            record['variants'].append({
+                'file': file_name,
+                'size': name,
+                'format': fmt,
+                'width': size[0],
+                'height': size[1],
+                'bytes': os.path.getsize(output_path)
+            })
+
+    return record
+
+def generate_variants(input_paths, output_dir, sizes=DEFAULT_SIZES, formats=DEFAULT_FORMATS, workers=None):
+    """Build variants for every ornament in parallel and write variants.json"""
+    sizes = parse_sizes(sizes)
+    formats = parse_formats(formats)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(make_variants, path, output_dir, sizes, formats) for path in input_paths]
+        records = [future.result() for future in futures]
+
+    manifest = {
+        'sizes': [name for name, _, _ in sizes],
+        'formats': formats,
+        'source_bytes': sum(r['bytes'] for r in records),
+        'ornaments': records
+    }
+    for name, _, _ in sizes:
+        for fmt in formats:
+            manifest[f"{name}_{fmt}_bytes"] = sum(
+                v['bytes'] for r in records for v in r['variants'] if v['size'] == name and v['format'] == fmt
+            )
+
+    with open(os.path.join(output_dir, 'variants.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate resized PNG/WebP variants of ornaments")
+    parser.add_argument('inputs', nargs='*', default=['assets/ornaments/ornament-*.png'],
+                        help="ornament files or glob patterns (default: assets/ornaments/ornament-*.png)")
+    parser.add_argument('-o', '--output-dir', default='assets/ornaments/variants')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"comma separated name=factor or name=<max side>px (default: {DEFAULT_SIZES})")
+    parser.add_argument('--formats', default=DEFAULT_FORMATS,
+                        help=f"comma separated png, webp, avif (default: {DEFAULT_FORMATS})")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = set()
+    for pattern in args.inputs:
+        paths.update(glob.glob(pattern))
+    paths = sorted(paths)
+    if not paths:
+        print("Error: no ornament images found!")
+        return
+
+    print(f"Generating variants for {len(paths)} ornaments...")
+    manifest = generate_variants(paths, args.output_dir, args.sizes, args.formats, args.workers)
+
+    print("-" * 50)
+    print(f"Source PNGs: {manifest['source_bytes']:,} bytes")
+    for name in manifest['sizes']:
+        for fmt in manifest['formats']:
+            print(f"  {name:>6} {fmt:<5} {manifest[f'{name}_{fmt}_bytes']:>12,} bytes")
+    print(f"Manifest written to {os.path.join(args.output_dir, 'variants.json')}")
+
+if __name__ == '__main__':
+    main()
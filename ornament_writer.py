@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Pipelined ornament writer
+Crops are queued and PNG-encoded and written on a thread pool, so encoding
+overlaps with cropping and trimming on the main thread
+"""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import manifest
+from instrumentation import stage
+
+def write_atomic(path, data):
+    """Write bytes to a temporary file next to path, then rename it into place"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def encode_png(image, compress_level=6, optimize=False):
+    """Encode an image to PNG bytes (Pillow releases the GIL while encoding)"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=compress_level, optimize=optimize)
+    return buffer.getvalue()
+
+class OrnamentWriter:
+    """
+    Thread pool that encodes and atomically writes ornament crops.
+
+    save() returns a future whose result is {'path', 'bytes', 'sha256'} plus
+    the crop's manifest fields (manifest.crop_fields, counting pixels with
+    alpha above alpha_threshold), so callers only need to keep the future. At most max_pending crops are held in memory; save()
+    blocks beyond that.
+    With max_error set, each crop is written as the smallest of a
+    recompressed PNG and palette quantizations within that mean delta E
+    (see png_optimizer), and the result also has 'mode'.
+    Use as a context manager so every write has finished on exit.
+    """
+
+    def __init__(self, workers=None, compress_level=6, optimize=False, max_pending=32, max_error=None,
+                 alpha_threshold=0):
+        self.compress_level = compress_level
+        self.alpha_threshold = alpha_threshold
+        self.optimize = optimize
+        self.max_error = max_error
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def _write(self, image, path):
+        try:
+            info = None
+            with stage('encode'):
+                if self.max_error is None:
+                    data = encode_png(image, self.compress_level, self.optimize)
+                else:
+                    from png_optimizer import optimize_png
+                    data, info = optimize_png(image, self.max_error)
+            with stage('write'):
+                write_atomic(path, data)
+            result = {'path': path, 'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest(),
+                      **manifest.crop_fields(image, self.alpha_threshold)}
+            if info:
+                result['mode'] = info['mode']
+            return result
+        finally:
+            self._slots.release()
+
+    def save(self, image, path):
+        """Queue image to be written to path as PNG"""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, image, path)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Block until every queued write is done; re-raises the first error"""
+        return [future.result() for future in self._futures]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
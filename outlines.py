@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Simplified outlines and hit-test masks for extracted ornaments
+A component's mask (a window of the label image from the labeling pass) is
+turned into polygon outlines by chaining its boundary pixel edges and
+simplifying them with Douglas-Peucker, plus a bit-packed low-resolution
+occupancy grid, so the editor can hit-test shapes instead of rectangles
+"""
+
+import base64
+
+import numpy as np
+
+from alpha_pyramid import max_pool
+
+DEFAULT_TOLERANCE = 1.0
+DEFAULT_CELL = 4
+MIN_RING_AREA = 4
+
+# Boundary edges run clockwise around each foreground pixel (y down):
+# top edge to the right, right edge down, bottom edge to the left, left edge up
+_STEPS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)])
+
+def boundary_rings(mask):
+    """
+    Closed boundary loops of a boolean mask on the pixel-corner grid.
+
+    Returns (rings, areas): each ring is an N x 2 array of (x, y) corners with
+    the collinear ones dropped, areas are signed (outer boundaries positive,
+    holes negative). Edges are chained and ordered with vectorized pointer
+    jumping rather than walked one at a time. At corners where two pixels
+    touch only diagonally the chain turns right, keeping them apart like the
+    4-connected labeling does.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    height, width = mask.shape
+    padded = np.pad(mask, 1)
+    core = padded[1:-1, 1:-1]
+
+    # Pixel sides facing the background: top, right, bottom, left
+    open_sides = [core & ~padded[:-2, 1:-1], core & ~padded[1:-1, 2:],
+                  core & ~padded[2:, 1:-1], core & ~padded[1:-1, :-2]]
+    corner_offsets = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    starts, directions = [], []
+    for direction, (side, (dx, dy)) in enumerate(zip(open_sides, corner_offsets)):
+        ys, xs = np.nonzero(side)
+        starts.append(np.column_stack((xs + dx, ys + dy)))
+        directions.append(np.full(len(xs), direction))
+    starts = np.concatenate(starts)
+    directions = np.concatenate(directions)
+    count = len(starts)
+    if count == 0:
+        return [], np.zeros(0)
+
+    # Successor of every edge: the edge leaving its end corner, preferring a
+    # right turn, then straight on, then a left turn
+    corner_stride = width + 1
+    start_corner = starts[:, 1] * corner_stride + starts[:, 0]
+    ends = starts + _STEPS[directions]
+    end_corner = ends[:, 1] * corner_stride + ends[:, 0]
+    outgoing = np.full(((height + 1) * corner_stride, 4), -1, dtype=np.int64)
+    outgoing[start_corner, directions] = np.arange(count)
+    successor = np.full(count, -1, dtype=np.int64)
+    for turn in (1, 0, 3):
+        missing = successor < 0
+        successor[missing] = outgoing[end_corner[missing], (directions[missing] + turn) % 4]
+
+    # Ring id = smallest edge index on the loop (pointer jumping)
+    ring = np.arange(count)
+    jump = successor.copy()
+    steps = int(np.ceil(np.log2(count))) + 1
+    for _ in range(steps):
+        ring = np.minimum(ring, ring[jump])
+        jump = jump[jump]
+
+    # Position along each ring: cut every loop before its first edge, then
+    # rank the resulting lists by their distance to the cut
+    last = successor == ring
+    jump = np.where(last, np.arange(count), successor)
+    remaining = (~last).astype(np.int64)
+    for _ in range(steps):
+        remaining = remaining + remaining[jump]
+        jump = jump[jump]
+
+    order = np.lexsort((-remaining, ring))
+    ring_ids = ring[order]
+    breaks = np.flatnonzero(np.diff(ring_ids)) + 1
+    points = starts[order]
+    turns = directions[order] != np.roll(directions[order], 1)
+    # Each ring's first edge is compared with its own last edge, not the previous ring's
+    ring_starts = np.concatenate(([0], breaks))
+    ring_ends = np.concatenate((breaks, [count])) - 1
+    turns[ring_starts] = directions[order][ring_starts] != directions[order][ring_ends]
+
+    # Signed shoelace area per ring
+    following = np.arange(count) + 1
+    following[ring_ends] = ring_starts
+    cross = points[:, 0] * points[following, 1] - points[following, 0] * points[:, 1]
+    areas = np.add.reduceat(cross, ring_starts) / 2
+
+    rings = [ring_points[ring_turns] for ring_points, ring_turns
+             in zip(np.split(points, breaks), np.split(turns, breaks))]
+    return rings, areas
+
+def _simplify_open(points, tolerance):
+    """Douglas-Peucker keep-flags for an open polyline"""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+def simplify_ring(points, tolerance=DEFAULT_TOLERANCE):
+    """Douglas-Peucker simplification of a closed ring of (x, y) points"""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) <= 4:
+        return points
+    # Split the ring at its first point and the point farthest from it
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    closed = np.concatenate((points, points[:1]))
+    keep = np.concatenate((_simplify_open(closed[:far + 1], tolerance)[:-1],
+                           _simplify_open(closed[far:], tolerance)[:-1]))
+    return points[keep]
+
+def outline(mask, tolerance=DEFAULT_TOLERANCE, min_area=MIN_RING_AREA):
+    """
+    Simplified outer outlines of a mask, largest first, as flat
+    [x0, y0, x1, y1, ...] lists in pixel-corner coordinates (holes are left
+    to the hit mask). Rings under min_area are dropped, but the largest ring
+    is always kept, so a tiny ornament still gets an outline.
+    """
+    rings, areas = boundary_rings(mask)
+    outer = sorted(((area, ring) for area, ring in zip(areas, rings) if area > 0), key=lambda item: -item[0])
+    outer = outer[:1] + [(area, ring) for area, ring in outer[1:] if area >= min_area]
+    return [np.round(simplify_ring(ring, tolerance)).astype(int).ravel().tolist() for _, ring in outer]
+
+def hit_mask(mask, cell=DEFAULT_CELL):
+    """
+    Occupancy grid of a mask at 1/cell resolution, a cell being set when any
+    of its pixels is. Rows are bit-packed MSB first and padded to whole
+    bytes: cell (x, y) is bit 7 - x % 8 of byte y * row_bytes + x // 8.
+    """
+    grid = max_pool(np.asarray(mask, dtype=np.uint8), cell).astype(bool)
+    rows, columns = grid.shape
+    return {
+        'cell': cell,
+        'width': columns,
+        'height': rows,
+        'row_bytes': (columns + 7) // 8,
+        'bits': base64.b64encode(np.packbits(grid, axis=1).tobytes()).decode('ascii'),
+    }
+
+def ornament_shape(mask, tolerance=DEFAULT_TOLERANCE, cell=DEFAULT_CELL):
+    """Manifest fields for one crop's mask: 'outline' and 'hit_mask'"""
+    return {'outline': outline(mask, tolerance), 'hit_mask': hit_mask(mask, cell)}
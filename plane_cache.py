@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped pixel planes for repeated analysis runs
+A sheet is decoded once into raw uint8 .npy planes keyed by its content
+hash; later runs map them read-only instead of decoding the PNG again, and
+concurrent processes share the same pages
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+import extraction_cache
+
+DEFAULT_PLANE_DIR = os.path.join(extraction_cache.DEFAULT_CACHE_DIR, 'planes')
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DECODE_ROWS = 256
+
+def _plane_path(cache_dir, digest, kind):
+    return os.path.join(cache_dir, f"{digest}.{kind}.npy")
+
+def _write_plane(path, shape, bands):
+    """
+    Write a uint8 .npy plane of shape from an iterable of row bands next to
+    path, then rename it into place. Plain writes keep the plane out of the
+    process's mapped memory.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.lib.format.write_array_header_1_0(f, {'descr': '|u1', 'fortran_order': False, 'shape': shape})
+            for band in bands:
+                f.write(np.ascontiguousarray(band, dtype=np.uint8).tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _bands(img, alpha_only):
+    """RGBA (or alpha) arrays of a sheet DECODE_ROWS rows at a time"""
+    width, height = img.size
+    for top in range(0, height, DECODE_ROWS):
+        band = img.crop((0, top, width, min(height, top + DECODE_ROWS)))
+        if band.mode != 'RGBA':
+            band = band.convert('RGBA')
+        yield np.asarray(band.getchannel('A') if alpha_only else band)
+
+def _decode(input_path, cache_dir, digest, rgba):
+    """
+    Write the sheet's missing planes (alpha, plus RGBA if rgba is set).
+
+    Planes are written band by band from the decoded image, so no full-size
+    RGBA or alpha array is built next to it.
+    """
+    with Image.open(input_path) as img:
+        width, height = img.size
+        alpha_path = _plane_path(cache_dir, digest, 'alpha')
+        if not os.path.exists(alpha_path):
+            _write_plane(alpha_path, (height, width), _bands(img, alpha_only=True))
+        rgba_path = _plane_path(cache_dir, digest, 'rgba')
+        if rgba and not os.path.exists(rgba_path):
+            _write_plane(rgba_path, (height, width, 4), _bands(img, alpha_only=False))
+
+def _map(path):
+    # Touch the plane so eviction is least-recently-used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return np.load(path, mmap_mode='r')
+
+def load_planes(input_path, cache_dir=DEFAULT_PLANE_DIR, rgba=False, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Read-only memory maps (alpha, rgba) of a sheet.
+
+    alpha is H x W and rgba is H x W x 4, or None unless rgba is set. The
+    sheet is decoded only if its planes are not cached yet; afterwards only
+    its bytes are hashed.
+    """
+    digest = extraction_cache.file_digest(input_path)
+    alpha_path = _plane_path(cache_dir, digest, 'alpha')
+    rgba_path = _plane_path(cache_dir, digest, 'rgba')
+
+    if not os.path.exists(alpha_path) or (rgba and not os.path.exists(rgba_path)):
+        os.makedirs(cache_dir, exist_ok=True)
+        _decode(input_path, cache_dir, digest, rgba)
+        # The planes just written are about to be mapped, never evict them
+        extraction_cache.evict(cache_dir, max_bytes, suffix='.npy', keep=(alpha_path, rgba_path))
+
+    return _map(alpha_path), (_map(rgba_path) if rgba else None)
+
+def load_alpha(input_path, cache_dir=DEFAULT_PLANE_DIR):
+    """Memory-mapped alpha plane of a sheet"""
+    return load_planes(input_path, cache_dir)[0]
+
+def open_sheet(input_path, cache_dir=DEFAULT_PLANE_DIR):
+    """
+    RGBA PIL image of a sheet backed by its memory-mapped plane (no copy);
+    returns (img, rgba) so callers can also slice the array directly
+    """
+    _, rgba = load_planes(input_path, cache_dir, rgba=True)
+    return Image.fromarray(rgba), rgba
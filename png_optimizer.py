@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Smaller PNGs for ornament assets
+Each image is tried as a recompressed lossless PNG, an exact palette PNG
+when it has few enough colours, and alpha-aware palette quantizations
+(PNG8 with a transparency chunk) that stay within a perceptual error
+budget; the smallest candidate is kept
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, features
+
+import extraction_cache
+import manifest
+
+# Mean CIE76 delta E over visible pixels; about 2.3 is a just noticeable difference
+DEFAULT_MAX_ERROR = 3.0
+PALETTE_SIZES = (256, 128, 64, 32, 16)
+COMPRESS_LEVEL = 9
+
+# libimagequant gives better palettes when this Pillow build has it
+QUANTIZE_METHOD = Image.Quantize.LIBIMAGEQUANT if features.check('libimagequant') else Image.Quantize.FASTOCTREE
+
+_XYZ = np.array([[0.4124, 0.3576, 0.1805],
+                 [0.2126, 0.7152, 0.0722],
+                 [0.0193, 0.1192, 0.9505]]) / np.array([0.95047, 1.0, 1.08883])[:, None]
+
+def _lab(rgb):
+    """CIELAB (D65) of sRGB values in 0-255"""
+    c = rgb / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _XYZ.T
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+def perceptual_error(original, candidate):
+    """
+    Mean CIE76 delta E between two RGBA images over their visible pixels.
+
+    Both are composited on black and on white and each pixel counts with the
+    worse of the two, so alpha errors show up as well as colour errors.
+    """
+    a = np.asarray(original.convert('RGBA'), dtype=np.float64)
+    b = np.asarray(candidate.convert('RGBA'), dtype=np.float64)
+    visible = (a[..., 3] > 0) | (b[..., 3] > 0)
+    if not visible.any():
+        return 0.0
+    a, b = a[visible], b[visible]
+
+    worst = np.zeros(len(a))
+    for background in (0.0, 255.0):
+        over_a = a[:, :3] * a[:, 3:] / 255 + background * (1 - a[:, 3:] / 255)
+        over_b = b[:, :3] * b[:, 3:] / 255 + background * (1 - b[:, 3:] / 255)
+        np.maximum(worst, np.linalg.norm(_lab(over_a) - _lab(over_b), axis=1), out=worst)
+    return float(worst.mean())
+
+def _encode(image, thorough=True):
+    buffer = io.BytesIO()
+    if thorough:
+        image.save(buffer, format='PNG', optimize=True, compress_level=COMPRESS_LEVEL)
+    else:
+        image.save(buffer, format='PNG', compress_level=6)
+    return buffer.getvalue()
+
+def _exact_palette(image):
+    """Lossless palette image when there are at most 256 distinct RGBA values, else None"""
+    pixels = np.ascontiguousarray(np.asarray(image)).view(np.uint32)[..., 0]
+    colors, indices = np.unique(pixels, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    palette_image = Image.frombytes('P', image.size, indices.astype(np.uint8).tobytes())
+    palette_image.putpalette(colors.view(np.uint8).tobytes(), rawmode='RGBA')
+    return palette_image
+
+def optimize_png(image, max_error=DEFAULT_MAX_ERROR, palette_sizes=PALETTE_SIZES):
+    """
+    Smallest PNG encoding of image within max_error.
+
+    Returns (data, info) with info {'mode', 'colors', 'error', 'bytes'};
+    mode is 'rgba', 'rgb' (alpha dropped because every pixel is opaque),
+    'palette' (exact) or 'quantized'. Palettes are tried from the largest
+    size down and the search stops at the first one over budget. The
+    lossless candidates only get the slow optimize pass when no palette
+    fits, as a palette PNG is usually several times smaller anyway.
+    """
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+
+    candidates = []
+    exact = _exact_palette(image)
+    if exact is not None:
+        candidates.append((_encode(exact), 'palette', len(exact.getpalette(rawmode='RGBA')) // 4, 0.0))
+    elif max_error > 0:
+        for colors in palette_sizes:
+            quantized = image.quantize(colors=colors, method=QUANTIZE_METHOD, dither=Image.Dither.NONE)
+            error = perceptual_error(image, quantized)
+            if error > max_error:
+                break
+            candidates.append((_encode(quantized), 'quantized', colors, error))
+
+    thorough = not candidates
+    candidates.append((_encode(image, thorough), 'rgba', None, 0.0))
+    if image.getchannel('A').getextrema()[0] == 255:
+        candidates.append((_encode(image.convert('RGB'), thorough), 'rgb', None, 0.0))
+
+    data, mode, colors, error = min(candidates, key=lambda candidate: len(candidate[0]))
+    return data, {'mode': mode, 'colors': colors, 'error': round(error, 3), 'bytes': len(data)}
+
+def optimize_file(input_path, output_path=None, max_error=DEFAULT_MAX_ERROR):
+    """
+    Re-encode one PNG. The file (or output_path) is only rewritten with the
+    result when it is smaller; returns a before/after record.
+    """
+    from ornament_writer import write_atomic
+
+    output_path = output_path or input_path
+    with open(input_path, 'rb') as f:
+        original = f.read()
+    with Image.open(io.BytesIO(original)) as img:
+        img.load()
+        data, info = optimize_png(img, max_error)
+
+    smaller = len(data) < len(original)
+    if smaller or output_path != input_path:
+        write_atomic(output_path, data if smaller else original)
+    written = data if smaller else original
+    return {
+        'file': os.path.basename(input_path),
+        'output': output_path,
+        'before': len(original),
+        'after': len(written),
+        'mode': info['mode'] if smaller else 'unchanged',
+        'colors': info['colors'] if smaller else None,
+        'error': info['error'] if smaller else 0.0,
+        'sha256': hashlib.sha256(written).hexdigest(),
+    }
+
+def _recount_pixels(path, threshold):
+    # Quantizing can change alpha coverage, so the manifest's count is redone
+    with Image.open(path) as img:
+        return manifest.crop_fields(img.convert('RGBA'), threshold)['pixels']
+
+def _update_manifests(records):
+    """Update ornaments.json entries of re-encoded files: hash, pixel count and PNG mode"""
+    by_dir = {}
+    for record in records:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(record['output'])), {})[record['file']] = record
+    for directory, files in by_dir.items():
+        if not os.path.exists(os.path.join(directory, manifest.MANIFEST_NAME)):
+            continue
+        with manifest.locked(directory):
+            current = manifest.load_manifest(directory)
+            changed = False
+            for entry in current['ornaments']:
+                record = files.get(entry['file'])
+                if record and record['mode'] != 'unchanged':
+                    pixels = _recount_pixels(record['output'], entry.get('alpha_threshold', 0))
+                    entry.update(sha256=record['sha256'], pixels=pixels, png_mode=record['mode'])
+                    changed = True
+            if changed:
+                manifest.write_manifest(directory, current)
+
+def optimize_files(input_paths, output_dir=None, max_error=DEFAULT_MAX_ERROR, workers=None,
+                   cache_dir=extraction_cache.DEFAULT_CACHE_DIR):
+    """
+    Optimize PNGs in parallel (in place unless output_dir is given) and
+    return a before/after summary. In place, any ornaments.json next to the
+    files is updated, and so are the extraction cache entries in cache_dir
+    that wrote them; otherwise the next cached extraction would find its
+    outputs changed and overwrite the optimized files with full PNGs.
+    """
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    outputs = [os.path.join(output_dir, os.path.basename(path)) if output_dir else path for path in input_paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        records = list(executor.map(optimize_file, input_paths, outputs, [max_error] * len(input_paths)))
+
+    if not output_dir:
+        _update_manifests(records)
+        if cache_dir:
+            extraction_cache.refresh_outputs([r['output'] for r in records if r['mode'] != 'unchanged'], cache_dir)
+
+    before = sum(r['before'] for r in records)
+    after = sum(r['after'] for r in records)
+    return {
+        'max_error': max_error,
+        'files': len(records),
+        'before_bytes': before,
+        'after_bytes': after,
+        'saved_percent': round(100 * (1 - after / before), 1) if before else 0.0,
+        'results': records,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrink ornament PNGs with recompression and palette quantization")
+    parser.add_argument('inputs', nargs='*', default=['assets/ornaments/ornament-*.png'],
+                        help="PNG files or glob patterns (default: assets/ornaments/ornament-*.png)")
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help="write optimized copies here instead of rewriting the files in place")
+    parser.add_argument('--max-error', type=float, default=DEFAULT_MAX_ERROR,
+                        help=f"largest mean delta E a palette may add (0 = lossless only, default: {DEFAULT_MAX_ERROR})")
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('--cache-dir', default=extraction_cache.DEFAULT_CACHE_DIR,
+                        help="extraction cache whose entries are updated for files optimized in place "
+                             f"(default: {extraction_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument('--report', default=None, help="also write the before/after report to this JSON file")
+    args = parser.parse_args()
+
+    paths = set()
+    for pattern in args.inputs:
+        paths.update(glob.glob(pattern))
+    paths = sorted(paths)
+    if not paths:
+        print("Error: no PNG files found!")
+        return
+
+    print(f"Optimizing {len(paths)} PNGs (max delta E {args.max_error})...")
+    summary = optimize_files(paths, args.output_dir, args.max_error, args.workers, args.cache_dir)
+
+    print("-" * 50)
+    for r in summary['results']:
+        detail = f"{r['mode']}" + (f", {r['colors']} colors, dE {r['error']}" if r['mode'] == 'quantized' else "")
+        print(f"  {r['file']:<28} {r['before']:>10,} -> {r['after']:>10,} bytes  ({detail})")
+    print("-" * 50)
+    print(f"Total: {summary['before_bytes']:,} -> {summary['after_bytes']:,} bytes "
+          f"({summary['saved_percent']}% smaller)")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report written to {args.report}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Array-backed region table shared by the extraction scripts
+Regions live in one NumPy structured array, so sorting, size filtering,
+padding and clipping run as vectorized operations instead of per-dict loops
+"""
+
+import numpy as np
+
+REGION_DTYPE = np.dtype([
+    ('left', np.int64),
+    ('top', np.int64),
+    ('right', np.int64),
+    ('bottom', np.int64),
+    ('pixels', np.int64),
+    ('label', np.int64),
+])
+
+class RegionTable:
+    """
+    Table of (left, top, right, bottom, pixels, label) regions.
+
+    right and bottom are exclusive, so every row is a PIL crop box. pixels is
+    the foreground pixel count (0 when unknown) and label the component label
+    in the source label image (0 when there is none). Indexing with an int
+    returns one record; slices, masks and index arrays return a new table.
+    """
+
+    def __init__(self, data=None):
+        self.data = np.zeros(0, dtype=REGION_DTYPE) if data is None else np.asarray(data, dtype=REGION_DTYPE)
+
+    @classmethod
+    def from_columns(cls, left, top, right, bottom, pixels=0, label=0):
+        """Build a table from per-field arrays (scalars are broadcast)"""
+        left = np.asarray(left)
+        data = np.zeros(len(left), dtype=REGION_DTYPE)
+        data['left'] = left
+        data['top'] = top
+        data['right'] = right
+        data['bottom'] = bottom
+        data['pixels'] = pixels
+        data['label'] = label
+        return cls(data)
+
+    @classmethod
+    def from_stats(cls, stats):
+        """Table over components.component_stats output (one row per label)"""
+        count = len(stats['pixels'])
+        return cls.from_columns(stats['left'], stats['top'], stats['right'] + 1, stats['bottom'] + 1,
+                                stats['pixels'], np.arange(1, count + 1))
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        """Table over (left, top, right, bottom) tuples"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        return cls.from_columns(boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3])
+
+    @classmethod
+    def from_records(cls, records):
+        """Table over region dicts, as stored by to_records()"""
+        data = np.zeros(len(records), dtype=REGION_DTYPE)
+        for name in REGION_DTYPE.names:
+            data[name] = [record.get(name, 0) for record in records]
+        return cls(data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            return self.data[key]
+        return RegionTable(self.data[key])
+
+    def __repr__(self):
+        return f"RegionTable({len(self)} regions)"
+
+    @property
+    def widths(self):
+        return self.data['right'] - self.data['left']
+
+    @property
+    def heights(self):
+        return self.data['bottom'] - self.data['top']
+
+    @property
+    def areas(self):
+        return self.widths * self.heights
+
+    def filter(self, min_pixels=None, min_width=None, min_height=None):
+        """Regions with more than min_pixels pixels and boxes wider/taller than the limits"""
+        keep = np.ones(len(self), dtype=bool)
+        if min_pixels is not None:
+            keep &= self.data['pixels'] > min_pixels
+        if min_width is not None:
+            keep &= self.widths > min_width
+        if min_height is not None:
+            keep &= self.heights > min_height
+        return RegionTable(self.data[keep])
+
+    def pad(self, padding):
+        """Grow every box by padding pixels on each side (may go out of bounds)"""
+        data = self.data.copy()
+        data['left'] -= padding
+        data['top'] -= padding
+        data['right'] += padding
+        data['bottom'] += padding
+        return RegionTable(data)
+
+    def clip(self, width, height):
+        """Clip every box to a width x height image"""
+        data = self.data.copy()
+        np.clip(data['left'], 0, width, out=data['left'])
+        np.clip(data['right'], 0, width, out=data['right'])
+        np.clip(data['top'], 0, height, out=data['top'])
+        np.clip(data['bottom'], 0, height, out=data['bottom'])
+        return RegionTable(data)
+
+    def sort(self):
+        """Regions in reading order: top to bottom, then left to right"""
+        return RegionTable(self.data[np.lexsort((self.data['left'], self.data['top']))])
+
+    def boxes(self):
+        """PIL crop boxes as tuples of Python ints"""
+        columns = np.stack([self.data['left'], self.data['top'], self.data['right'], self.data['bottom']], axis=1)
+        return [tuple(box) for box in columns.tolist()]
+
+    def to_records(self):
+        """Regions as JSON-friendly dicts"""
+        return [dict(zip(REGION_DTYPE.names, row)) for row in self.data.tolist()]
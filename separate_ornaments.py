@@ -6,65 +6,75 @@ Script to separate individual ornaments from a composite image
 from PIL import Image
 import os
 
-def separate_ornaments_advanced(input_path, output_dir):
+import manifest
+from grid_detect import detect_grid_for_image
+from instrumentation import stage
+from ornament_writer import OrnamentWriter
+
+def separate_ornaments_advanced(input_path, output_dir, cols=None, rows=None, png_error=None, compress_level=6):
     """
     Separate ornaments using smarter detection
+
+    The grid is detected from the alpha channel unless cols and rows are given,
+    in which case the sheet is cut into equal cells. With png_error set,
+    crops are palette-quantized within that mean delta E; otherwise they
+    are plain PNGs at zlib compress_level (0-9).
     """
     # Open the image
-    img = Image.open(input_path)
+    with stage('decode'):
+        img = Image.open(input_path)
+        img.load()
     print(f"Image size: {img.size}")
     print(f"Image mode: {img.mode}")
     
     width, height = img.size
     
-    # Try different grid configurations for 14 ornaments
-    # Common layouts: 7x2, 2x7
-    configs = [
-        (7, 2),  # 7 columns, 2 rows
-        (2, 7),  # 2 columns, 7 rows
-    ]
-    
-    print("\nTrying different grid configurations...")
-    
-    for cols, rows in configs:
-        print(f"\nTrying {cols}x{rows} grid:")
+    if cols and rows:
         ornament_width = width // cols
         ornament_height = height // rows
-        print(f"  Each ornament: {ornament_width}x{ornament_height}")
-        
-    # Let's use 7 columns x 2 rows (more likely for ornaments)
-    cols = 7
-    rows = 2
-    
-    ornament_width = width // cols
-    ornament_height = height // rows
-    
-    print(f"\nUsing grid: {cols}x{rows}")
-    print(f"Each ornament size: {ornament_width}x{ornament_height}")
+        col_edges = [col * ornament_width for col in range(cols + 1)]
+        row_edges = [row * ornament_height for row in range(rows + 1)]
+        print(f"\nUsing grid: {cols}x{rows}")
+        print(f"Each ornament size: {ornament_width}x{ornament_height}")
+    else:
+        print("\nDetecting grid layout...")
+        with stage('grid'):
+            grid = detect_grid_for_image(img)
+        cols, rows = grid['cols'], grid['rows']
+        col_edges, row_edges = grid['col_edges'], grid['row_edges']
+        print(f"\nUsing grid: {cols}x{rows}")
+        print(f"Column edges: {col_edges}")
+        print(f"Row edges: {row_edges}")
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
     ornament_count = 0
+    saved = []
     
     # Extract each ornament
-    for row in range(rows):
-        for col in range(cols):
-            ornament_count += 1
-            
-            # Calculate crop box
-            left = col * ornament_width
-            top = row * ornament_height
-            right = left + ornament_width
-            bottom = top + ornament_height
-            
-            # Crop the ornament
-            ornament = img.crop((left, top, right, bottom))
-            
-            # Save the ornament
-            output_path = os.path.join(output_dir, f"ornament-{ornament_count}.png")
-            ornament.save(output_path)
-            print(f"Saved: ornament-{ornament_count}.png ({left},{top} to {right},{bottom})")
+    with OrnamentWriter(compress_level=compress_level, max_error=png_error) as writer:
+        for row in range(rows):
+            for col in range(cols):
+                ornament_count += 1
+                
+                # Calculate crop box
+                left = col_edges[col]
+                top = row_edges[row]
+                right = col_edges[col + 1]
+                bottom = row_edges[row + 1]
+                
+                # Crop the ornament
+                with stage('crop'):
+                    ornament = img.crop((left, top, right, bottom))
+                
+                # Save the ornament
+                output_path = os.path.join(output_dir, f"ornament-{ornament_count}.png")
+                saved.append((writer.save(ornament, output_path), (left, top, right, bottom)))
+                print(f"Saved: ornament-{ornament_count}.png ({left},{top} to {right},{bottom})")
+    
+    entries = manifest.written_entries(saved, input_path, 'grid')
+    manifest.update_manifest(output_dir, input_path, 'grid', entries)
     
     print(f"\nSuccessfully extracted {ornament_count} ornaments!")
     return ornament_count
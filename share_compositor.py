@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Server-side compositor for decorated-tree share images
+Renders saved designs (background, tree, ornament and text placements as
+stored by editor.js) to PNG with Pillow, laid out the way view.js shows
+them. Scaled and rotated ornament layers are cached per worker process, and
+batches of designs are rendered across a process pool
+"""
+
+import argparse
+import base64
+import functools
+import io
+import json
+import math
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageOps
+
+from ornament_writer import encode_png, write_atomic
+
+# The editor canvas is at most 800px wide at 4:3; placements are in its CSS pixels
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 600
+TREE_MAX_FRACTION = 0.8
+DEFAULT_Z_INDEX = 10
+SOURCE_CACHE_SIZE = 64
+LAYER_CACHE_SIZE = 512
+
+# Saved designs may point anywhere; images are only downloaded from the
+# app's storage bucket (see supabase-config.js) and only up to this size
+DEFAULT_FETCH_HOSTS = ('etikcksmwuwovxougium.supabase.co',)
+MAX_FETCH_BYTES = 32 * 1024 * 1024
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+
+def _length(value, reference, default):
+    """CSS length ('12px', '12.5', '40%') in canvas pixels"""
+    if value in (None, ''):
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = value.strip()
+    if value.endswith('%'):
+        return float(value[:-1]) * reference / 100
+    return float(value[:-2] if value.endswith('px') else value)
+
+def _color(value, default=(255, 255, 255, 255)):
+    try:
+        color = ImageColor.getrgb(value.strip())
+    except (AttributeError, ValueError):
+        return default
+    return color if len(color) == 4 else (*color, 255)
+
+def _rotation(item):
+    """Clockwise rotation in degrees from 'rotation' or a CSS rotate() transform"""
+    if item.get('rotation') not in (None, ''):
+        return float(item['rotation'])
+    match = re.search(r'rotate\(\s*(-?[\d.]+)(deg|rad|turn)?\s*\)', item.get('transform') or '')
+    if not match:
+        return 0.0
+    angle = float(match.group(1))
+    unit = match.group(2) or 'deg'
+    return math.degrees(angle) if unit == 'rad' else angle * 360 if unit == 'turn' else angle
+
+def _scale(item):
+    """Extra scale factor from a CSS scale() transform"""
+    match = re.search(r'scale\(\s*([\d.]+)\s*\)', item.get('transform') or '')
+    return float(match.group(1)) if match else 1.0
+
+class _AllowedRedirects(urllib.request.HTTPRedirectHandler):
+    """Follow redirects only to hosts that may be fetched from"""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlsplit(newurl).hostname not in self.hosts:
+            raise urllib.error.HTTPError(newurl, code, "Redirect to a host that is not allowed", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+def _download(url, hosts):
+    opener = urllib.request.build_opener(_AllowedRedirects(hosts))
+    with opener.open(url, timeout=30) as response:
+        data = response.read(MAX_FETCH_BYTES + 1)
+    if len(data) > MAX_FETCH_BYTES:
+        raise ValueError(f"Image is larger than {MAX_FETCH_BYTES // 2**20} MiB: {url[:200]}")
+    return data
+
+@functools.lru_cache(maxsize=SOURCE_CACHE_SIZE)
+def load_source(src, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """
+    Decoded RGBA image for an img src.
+
+    data: URLs are decoded; other URLs are read from the matching path under
+    asset_root when it exists there (paths that resolve outside asset_root
+    are refused), and otherwise downloaded if their host is in fetch_hosts.
+    Cached images are shared, so callers must not modify them.
+    """
+    if src.startswith('data:'):
+        header, _, payload = src.partition(',')
+        data = base64.b64decode(payload) if header.endswith(';base64') else unquote(payload).encode()
+    else:
+        parts = urlsplit(src)
+        root = os.path.realpath(asset_root)
+        local_path = os.path.realpath(os.path.join(root, unquote(parts.path).lstrip('/')))
+        inside = local_path.startswith(root + os.sep)
+        if inside and os.path.isfile(local_path):
+            with open(local_path, 'rb') as f:
+                data = f.read()
+        elif parts.scheme in ('http', 'https') and parts.hostname in fetch_hosts:
+            data = _download(src, fetch_hosts)
+        elif parts.scheme in ('http', 'https') and fetch_hosts:
+            raise ValueError(f"Image is not under {asset_root} and {parts.hostname} is not an allowed host: "
+                             f"{src[:200]}")
+        elif not inside:
+            raise ValueError(f"Image path is outside {asset_root}: {src[:200]}")
+        else:
+            raise FileNotFoundError(f"Image not found under {asset_root}: {src[:200]}")
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        return img.convert('RGBA') if img.mode != 'RGBA' else img.copy()
+
+@functools.lru_cache(maxsize=LAYER_CACHE_SIZE)
+def ornament_layer(src, width, height, rotation=0.0, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """
+    Source scaled to fit (object-fit: contain) a width x height box, then
+    rotated clockwise about the box center.
+
+    Returns (layer, dx, dy), the layer's offset from the box's top left.
+    """
+    source = load_source(src, asset_root, fetch_hosts)
+    ratio = min(width / source.width, height / source.height)
+    size = (max(1, round(source.width * ratio)), max(1, round(source.height * ratio)))
+    layer = source.resize(size, Image.LANCZOS) if size != source.size else source
+    if rotation % 360:
+        layer = layer.rotate(-rotation, resample=Image.BICUBIC, expand=True)
+    return layer, (width - layer.width) // 2, (height - layer.height) // 2
+
+@functools.lru_cache(maxsize=32)
+def _font(family, size):
+    """TrueType font for a CSS font-family list, falling back to Pillow's default"""
+    bundled = sorted(f for f in os.listdir(FONT_DIR) if f.endswith('.ttf')) if os.path.isdir(FONT_DIR) else []
+    for name in (family or '').split(','):
+        name = name.strip().strip('\'"')
+        if not name:
+            continue
+        # System fonts by name, then the site's own fonts/ folder
+        compact = name.replace(' ', '')
+        candidates = [f"{name}.ttf", f"{compact}.ttf"]
+        candidates += [os.path.join(FONT_DIR, f) for f in bundled if f.lower().startswith(compact.lower())]
+        for candidate in candidates:
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+def _gradient(stops, width, height, diagonal):
+    """Linear gradient image; stops are (rgba, offset 0-1) pairs"""
+    if diagonal:
+        t = (np.arange(width)[None, :] / max(width - 1, 1) + np.arange(height)[:, None] / max(height - 1, 1)) / 2
+    else:
+        t = np.broadcast_to(np.arange(height)[:, None] / max(height - 1, 1), (height, width))
+    offsets = [offset for _, offset in stops]
+    channels = [np.interp(t, offsets, [color[c] for color, _ in stops]) for c in range(4)]
+    return Image.fromarray(np.round(np.stack(channels, axis=2)).astype(np.uint8))
+
+def background_image(background, width, height, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """
+    Canvas background from the stored CSS background, approximated the same
+    way as cssBackgroundToImageUrl in editor.js
+    """
+    background = background or 'white'
+    url = re.search(r'url\([\'"]?([^\'"()]+)[\'"]?\)', background)
+    if url:
+        # background-size: cover, centered
+        return ImageOps.fit(load_source(url.group(1), asset_root, fetch_hosts), (width, height), Image.LANCZOS)
+
+    if 'linear-gradient' in background:
+        matches = re.findall(r'(#[0-9a-f]{6}|rgb\([^)]+\))\s*(\d+)?%?', background, flags=re.IGNORECASE)
+        if matches:
+            stops = [
+                (_color(color), float(offset) / 100 if offset else i / max(len(matches) - 1, 1))
+                for i, (color, offset) in enumerate(matches)
+            ]
+            angle = re.search(r'(\d+)deg', background)
+            return _gradient(sorted(stops, key=lambda stop: stop[1]), width, height,
+                             diagonal=angle is not None and angle.group(1) == '135')
+
+    if 'radial-gradient' in background:
+        color = _color('#e8f4f8' if '#e8f4f8' in background else '#1a237e')
+    else:
+        color = _color(background, None)
+        if color is None:
+            token = re.search(r'#[0-9a-f]{3,8}\b|rgba?\([^)]+\)', background, flags=re.IGNORECASE)
+            color = _color(token.group(0)) if token else _color('white')
+    return Image.new('RGBA', (width, height), color)
+
+def _text_layer(text, scale):
+    """Text with view.js's bold weight and soft shadow on its own layer; returns (layer, offset)"""
+    size = max(1, round(_length(text.get('fontSize'), CANVAS_HEIGHT, 24) * scale))
+    font = _font(text.get('fontFamily'), size)
+    content = text.get('content', '')
+    color = _color(text.get('color'), (0, 0, 0, 255))
+
+    # A thin stroke stands in for font-weight: bold
+    bold = max(1, size // 24)
+    shadow = max(1, round(scale))
+    right, bottom = font.getbbox(content, stroke_width=bold)[2:]
+    size = (right + bold + shadow + 1, bottom + bold + shadow + 1)
+
+    layer = Image.new('RGBA', size)
+    ImageDraw.Draw(layer).text((bold + shadow, bold + shadow), content, font=font, fill=(0, 0, 0, 77),
+                               stroke_width=bold, stroke_fill=(0, 0, 0, 77))
+    lettering = Image.new('RGBA', size)
+    ImageDraw.Draw(lettering).text((bold, bold), content, font=font, fill=color, stroke_width=bold, stroke_fill=color)
+    return Image.alpha_composite(layer, lettering), -bold
+
+def render_design(design, width=CANVAS_WIDTH, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """
+    Composite one saved design to an RGBA image width pixels wide (4:3).
+
+    Layers are stacked by zIndex like view.js: the tree (z 1, centered and
+    at most 80% of the canvas, never upscaled), then ornaments and texts in
+    their stored order.
+    """
+    scale = width / CANVAS_WIDTH
+    height = round(CANVAS_HEIGHT * scale)
+    canvas = background_image(design.get('background'), width, height, asset_root, fetch_hosts).copy()
+
+    items = []
+    if design.get('tree'):
+        items.append((1, 'tree', design))
+    for ornament in design.get('ornaments') or []:
+        items.append((int(ornament.get('zIndex') or DEFAULT_Z_INDEX), 'ornament', ornament))
+    for text in design.get('texts') or []:
+        items.append((int(text.get('zIndex') or DEFAULT_Z_INDEX), 'text', text))
+    items.sort(key=lambda item: item[0])
+
+    for _, kind, item in items:
+        if kind == 'tree':
+            tree = load_source(item['tree'], asset_root, fetch_hosts)
+            fit = min(1.0, TREE_MAX_FRACTION * CANVAS_WIDTH / tree.width,
+                      TREE_MAX_FRACTION * CANVAS_HEIGHT / tree.height) * scale
+            box_width, box_height = max(1, round(tree.width * fit)), max(1, round(tree.height * fit))
+            layer, dx, dy = ornament_layer(item['tree'], box_width, box_height, 0.0, asset_root, fetch_hosts)
+            canvas.alpha_composite(layer, ((width - box_width) // 2 + dx, (height - box_height) // 2 + dy))
+        elif kind == 'ornament':
+            box_width = _length(item.get('width'), CANVAS_WIDTH, 100) * scale
+            box_height = _length(item.get('height'), CANVAS_HEIGHT, 100) * scale
+            extra = _scale(item)
+            left = _length(item.get('left'), CANVAS_WIDTH, 0) * scale + box_width * (1 - extra) / 2
+            top = _length(item.get('top'), CANVAS_HEIGHT, 0) * scale + box_height * (1 - extra) / 2
+            box_width, box_height = max(1, round(box_width * extra)), max(1, round(box_height * extra))
+            layer, dx, dy = ornament_layer(item['src'], box_width, box_height, _rotation(item),
+                                           asset_root, fetch_hosts)
+            _paste(canvas, layer, round(left) + dx, round(top) + dy)
+        else:
+            layer, offset = _text_layer(item, scale)
+            _paste(canvas, layer, round(_length(item.get('left'), CANVAS_WIDTH, 0) * scale) + offset,
+                   round(_length(item.get('top'), CANVAS_HEIGHT, 0) * scale) + offset)
+
+    return canvas
+
+def _paste(canvas, layer, x, y):
+    """alpha_composite that clips layers hanging over the canvas edge"""
+    left, top = max(0, -x), max(0, -y)
+    right, bottom = min(layer.width, canvas.width - x), min(layer.height, canvas.height - y)
+    if right <= left or bottom <= top:
+        return
+    canvas.alpha_composite(layer, (x + left, y + top), (left, top, right, bottom))
+
+def load_designs(paths):
+    """
+    (id, design) pairs from JSON files holding one design, one saved row
+    ({'id', 'design_data', ...} as in the decorated_trees table) or a list
+    of either
+    """
+    designs = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        rows = data if isinstance(data, list) else [data]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for idx, row in enumerate(rows, 1):
+            design = row.get('design_data', row)
+            design_id = row.get('id') or (stem if len(rows) == 1 else f"{stem}-{idx}")
+            designs.append((str(design_id), design))
+    return designs
+
+def render_one(design_id, design, output_path, width=CANVAS_WIDTH, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """Render and write one design; errors are reported instead of raised"""
+    start = time.perf_counter()
+    hits = ornament_layer.cache_info().hits
+    try:
+        data = encode_png(render_design(design, width, asset_root, fetch_hosts))
+        write_atomic(output_path, data)
+        error = None
+    except Exception as e:
+        data = b''
+        error = f"{type(e).__name__}: {e}"
+    return {
+        'id': design_id,
+        'output': output_path,
+        'bytes': len(data),
+        'layer_cache_hits': ornament_layer.cache_info().hits - hits,
+        'seconds': round(time.perf_counter() - start, 3),
+        'error': error,
+    }
+
+def render_batch(designs, output_dir, width=CANVAS_WIDTH, workers=None, asset_root='.', fetch_hosts=DEFAULT_FETCH_HOSTS):
+    """
+    Render (id, design) pairs to output_dir/<id>.png in parallel and write
+    summary.json. Designs go to the workers in contiguous chunks, so each
+    worker's layer cache is reused across the designs it renders.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(designs) // (workers * 4))
+    outputs = [os.path.join(output_dir, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', design_id)}.png")
+               for design_id, _ in designs]
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(render_one, [i for i, _ in designs], [d for _, d in designs], outputs,
+                                   [width] * len(designs), [asset_root] * len(designs), [fetch_hosts] * len(designs),
+                                   chunksize=chunksize):
+            results.append(result)
+            if result['error']:
+                print(f"✗ {result['id']}: {result['error']}")
+            else:
+                print(f"✓ {result['id']}: {result['bytes']} bytes ({result['seconds']}s)")
+
+    summary = {
+        'width': width,
+        'workers': workers,
+        'designs': len(results),
+        'failed': sum(1 for r in results if r['error']),
+        'layer_cache_hits': sum(r['layer_cache_hits'] for r in results),
+        'seconds': round(time.perf_counter() - start, 3),
+        'results': results,
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Render saved tree designs to share images and thumbnails")
+    parser.add_argument('inputs', nargs='+',
+                        help="JSON files with a design, a decorated_trees row or a list of them")
+    parser.add_argument('-o', '--output-dir', default='assets/thumbnails')
+    parser.add_argument('--width', type=int, default=CANVAS_WIDTH // 2,
+                        help=f"output width in pixels (4:3; {CANVAS_WIDTH} is full editor size, "
+                             f"the default matches the editor's half-scale thumbnails)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--asset-root', default='.',
+                        help="site folder that image URLs are resolved against before downloading")
+    parser.add_argument('--fetch-host', action='append', default=None, metavar='HOST',
+                        help="host images missing locally may be downloaded from, repeatable "
+                             f"(default: {', '.join(DEFAULT_FETCH_HOSTS)})")
+    parser.add_argument('--no-fetch', action='store_true', help="never download images missing locally")
+    args = parser.parse_args()
+
+    designs = load_designs(args.inputs)
+    if not designs:
+        print("Error: no designs found!")
+        return
+
+    print(f"Rendering {len(designs)} designs at {args.width}px...")
+    print("-" * 50)
+    summary = render_batch(designs, args.output_dir, args.width, args.workers, args.asset_root,
+                           () if args.no_fetch else tuple(args.fetch_host or DEFAULT_FETCH_HOSTS))
+    print("-" * 50)
+    print(f"Done! Rendered {summary['designs'] - summary['failed']} designs in {summary['seconds']}s "
+          f"({summary['failed']} failed, {summary['layer_cache_hits']} cached layers reused)")
+    print(f"Summary written to {os.path.join(args.output_dir, 'summary.json')}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Pack extracted ornaments into power-of-two sprite atlases
+Writes atlas-N.png sheets plus a JSON frame map for the front end
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+
+from PIL import Image
+
+def _natural_key(path):
+    """Sort ornament-2.png before ornament-10.png"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', os.path.basename(path))]
+
+class MaxRectsBin:
+    """MaxRects bin packer using the best-short-side-fit heuristic"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, w, h):
+        """Place a w x h rectangle, returning (x, y) or None if it does not fit"""
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                score = (min(fw - w, fh - h), max(fw - w, fh - h))
+                if best_score is None or score < best_score:
+                    best = (fx, fy)
+                    best_score = score
+        if best is None:
+            return None
+
+        self._split(best[0], best[1], w, h)
+        return best
+
+    def _split(self, x, y, w, h):
+        """Carve the placed rectangle out of every free rectangle it overlaps"""
+        new_free = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+                new_free.append((fx, fy, fw, fh))
+                continue
+            if x > fx:
+                new_free.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw:
+                new_free.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy:
+                new_free.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh:
+                new_free.append((fx, y + h, fw, fy + fh - y - h))
+
+        # Drop free rectangles contained in another one
+        self.free = [
+            r for i, r in enumerate(new_free)
+            if not any(
+                j != i and o[0] <= r[0] and o[1] <= r[1]
+                and o[0] + o[2] >= r[0] + r[2] and o[1] + o[3] >= r[1] + r[3]
+                and (o != r or j < i)
+                for j, o in enumerate(new_free)
+            )
+        ]
+
+def _next_power_of_two(value):
+    size = 1
+    while size < value:
+        size *= 2
+    return size
+
+def _try_pack(sizes, width, height):
+    """Pack as many sizes as possible into one bin, in the given order"""
+    packer = MaxRectsBin(width, height)
+    placed = {}
+    for idx, (w, h) in sizes:
+        position = packer.insert(w, h)
+        if position is not None:
+            placed[idx] = position
+    return placed
+
+def pack_sizes(sizes, max_size=2048, padding=2):
+    """
+    Assign every (w, h) to a sheet and position.
+
+    Each sheet is the smallest power-of-two square (or 2:1 rectangle) that
+    holds what it can; whatever does not fit spills into the next sheet.
+    Returns (sheets, placements) where sheets is a list of (width, height) and
+    placements maps index -> (sheet, x, y).
+    """
+    padded = [(idx, (w + padding, h + padding)) for idx, (w, h) in enumerate(sizes)]
+    for idx, (w, h) in padded:
+        if w > max_size or h > max_size:
+            raise ValueError(f"Sprite {idx} ({w - padding}x{h - padding}) is larger than max atlas size {max_size}")
+
+    # Big sprites first packs tighter
+    remaining = sorted(padded, key=lambda item: (max(item[1]), item[1][0] * item[1][1]), reverse=True)
+    sheets = []
+    placements = {}
+
+    while remaining:
+        area = sum(w * h for _, (w, h) in remaining)
+        longest = max(max(w, h) for _, (w, h) in remaining)
+        side = min(max_size, _next_power_of_two(max(longest, int(area ** 0.5))))
+
+        candidates = []
+        while True:
+            if side // 2 >= longest:
+                candidates.append((side, side // 2))
+            candidates.append((side, side))
+            if side >= max_size:
+                break
+            # The last candidate is max_size itself when it is not a power of two
+            side = min(side * 2, max_size)
+
+        placed = {}
+        sheet_size = candidates[-1]
+        for width, height in candidates:
+            placed = _try_pack(remaining, width, height)
+            sheet_size = (width, height)
+            if len(placed) == len(remaining):
+                break
+
+        sheet = len(sheets)
+        sheets.append(sheet_size)
+        for idx, (x, y) in placed.items():
+            placements[idx] = (sheet, x, y)
+        remaining = [item for item in remaining if item[0] not in placed]
+
+    return sheets, placements
+
+def frame_names(sprite_paths):
+    """
+    Frame key of every sprite: its path relative to the folder all sprites
+    share, with '/' separators, so a single folder keeps plain file names
+    and same-named files from different folders stay apart
+    """
+    paths = [os.path.abspath(path) for path in sprite_paths]
+    if len(set(paths)) != len(paths):
+        raise ValueError("The same sprite is listed more than once")
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.relpath(path, root).replace(os.sep, '/') for path in paths]
+
+def build_atlas(sprite_paths, output_dir, name='atlas', max_size=2048, padding=2):
+    """Pack sprite images into atlas sheets and write name.json next to them"""
+    names = frame_names(sprite_paths) if sprite_paths else []
+    sprites = [Image.open(path).convert('RGBA') for path in sprite_paths]
+    sheets, placements = pack_sizes([s.size for s in sprites], max_size, padding)
+
+    os.makedirs(output_dir, exist_ok=True)
+    canvases = [Image.new('RGBA', size, (0, 0, 0, 0)) for size in sheets]
+    frames = {}
+    for idx, (frame_name, sprite) in enumerate(zip(names, sprites)):
+        sheet, x, y = placements[idx]
+        canvases[sheet].paste(sprite, (x, y))
+        frames[frame_name] = {
+            'sheet': sheet,
+            'x': x,
+            'y': y,
+            'w': sprite.size[0],
+            'h': sprite.size[1]
+        }
+
+    sheet_info = []
+    for sheet, canvas in enumerate(canvases):
+        file_name = f"{name}-{sheet + 1}.png"
+        canvas.save(os.path.join(output_dir, file_name), optimize=True)
+        sheet_info.append({'file': file_name, 'width': canvas.size[0], 'height': canvas.size[1]})
+        print(f"Saved {file_name} ({canvas.size[0]}x{canvas.size[1]})")
+
+    manifest = {'sheets': sheet_info, 'frames': frames}
+    manifest_path = os.path.join(output_dir, f"{name}.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Saved {name}.json ({len(frames)} frames)")
+
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack extracted ornaments into sprite atlases")
+    parser.add_argument('inputs', nargs='*', default=['assets/ornaments/ornament-*.png'],
+                        help="ornament files or glob patterns (default: assets/ornaments/ornament-*.png)")
+    parser.add_argument('-o', '--output-dir', default='assets/atlas')
+    parser.add_argument('--name', default='atlas', help="base name for sheets and manifest")
+    parser.add_argument('--max-size', type=int, default=2048, help="largest sheet side in pixels")
+    parser.add_argument('--padding', type=int, default=2, help="transparent gap between sprites")
+    args = parser.parse_args()
+
+    paths = set()
+    for pattern in args.inputs:
+        paths.update(glob.glob(pattern))
+    paths = sorted(paths, key=_natural_key)
+    if not paths:
+        print("Error: no ornament images found!")
+        return
+
+    print(f"Packing {len(paths)} ornaments...")
+    manifest = build_atlas(paths, args.output_dir, args.name, args.max_size, args.padding)
+    print(f"Done! {len(manifest['frames'])} ornaments in {len(manifest['sheets'])} sheet(s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_SHEET = os.path.join(ROOT, 'assets', 'ornamnents.PNG')
+
+def draw_sheet(size=(240, 160), seed=0, blobs=24):
+    """RGBA sheet with random opaque rectangles and soft-edged discs"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    yy, xx = np.mgrid[:height, :width]
+    for i in range(blobs):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        color = rng.integers(0, 256, 3)
+        if i % 2:
+            w, h = int(rng.integers(2, 20)), int(rng.integers(2, 20))
+            pixels[y:y + h, x:x + w, :3] = color
+            pixels[y:y + h, x:x + w, 3] = 255
+        else:
+            r = int(rng.integers(3, 14))
+            d = np.hypot(xx - x, yy - y)
+            alpha = np.clip((r - d) * 64, 0, 255).astype(np.uint8)
+            inside = alpha > pixels[:, :, 3]
+            pixels[inside, :3] = color
+            pixels[inside, 3] = alpha[inside]
+    return Image.fromarray(pixels, 'RGBA')
+
+def draw_grid_sheet(cols=4, rows=2, cell=(70, 90), seed=0):
+    """RGBA sheet with one soft-edged ornament per grid cell and empty gutters"""
+    rng = np.random.default_rng(seed)
+    cell_width, cell_height = cell
+    pixels = np.zeros((rows * cell_height + 7, cols * cell_width + 5, 4), dtype=np.uint8)
+    yy, xx = np.mgrid[:cell_height, :cell_width]
+    for row in range(rows):
+        for col in range(cols):
+            cx, cy = rng.integers(25, cell_width - 25), rng.integers(30, cell_height - 30)
+            d = np.hypot((xx - cx) / rng.uniform(0.8, 1.2), yy - cy)
+            alpha = np.clip((20 - d) * 40, 0, 255).astype(np.uint8)
+            window = pixels[row * cell_height:(row + 1) * cell_height, col * cell_width:(col + 1) * cell_width]
+            window[:, :, :3] = rng.integers(0, 256, 3)
+            window[:, :, 3] = alpha
+    return Image.fromarray(pixels, 'RGBA')
+
+@pytest.fixture
+def sheet_path(tmp_path):
+    path = tmp_path / 'sheet.png'
+    draw_sheet().save(path)
+    return str(path)
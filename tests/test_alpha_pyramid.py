@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from alpha_pyramid import build_pyramid, coarse_components, coarse_profile, max_pool
+from components import component_stats
+from conftest import ROOT, draw_grid_sheet, draw_sheet
+from extract_ornaments import find_bounding_boxes
+from extract_smart import find_regions_in_alpha
+from gaps import projection_profile
+
+# Odd sizes so the last coarse cells are partly padding
+ALPHAS = [np.asarray(draw_sheet(size=(237, 151), seed=seed))[:, :, 3] for seed in range(3)]
+
+def test_max_pool_keeps_block_maxima():
+    alpha = ALPHAS[0]
+    pooled = max_pool(alpha, 4)
+    assert pooled.shape == (38, 60)
+    for y, x in np.ndindex(*pooled.shape):
+        assert pooled[y, x] == alpha[y * 4:(y + 1) * 4, x * 4:(x + 1) * 4].max()
+    assert np.array_equal(build_pyramid(alpha, 4)[-1], pooled)
+
+def test_pyramid_factor_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        build_pyramid(ALPHAS[0], 6)
+
+@pytest.mark.parametrize('factor', [2, 4, 8, 16])
+@pytest.mark.parametrize('alpha', ALPHAS)
+def test_coarse_profile_matches_full(alpha, factor):
+    for axis in (0, 1):
+        for threshold in (0, 50, 200):
+            assert np.array_equal(coarse_profile(alpha, threshold, axis, factor),
+                                  projection_profile(alpha, threshold, axis))
+
+@pytest.mark.parametrize('factor', [2, 8])
+@pytest.mark.parametrize('alpha', ALPHAS)
+def test_coarse_components_match_full(alpha, factor):
+    for threshold in (10, 50):
+        expected = component_stats(*ndimage.label(alpha > threshold))
+        stats = coarse_components(alpha, threshold, factor)
+        for name in ('top', 'left', 'bottom', 'right', 'pixels'):
+            assert np.array_equal(stats[name], expected[name]), name
+        assert np.allclose(stats['cy'], expected['cy']) and np.allclose(stats['cx'], expected['cx'])
+
+def test_coarse_regions_and_boxes_match_full():
+    sheet = np.asarray(draw_grid_sheet())
+    assert find_regions_in_alpha(sheet[:, :, 3], coarse_factor=8).boxes() == \
+        find_regions_in_alpha(sheet[:, :, 3]).boxes()
+    for seed in range(3):
+        sheet = np.asarray(draw_sheet(seed=seed))
+        assert find_bounding_boxes(sheet, coarse_factor=4).boxes() == find_bounding_boxes(sheet).boxes()
+
+def test_coarse_gap_analysis_does_not_import_scipy():
+    code = ("import sys, numpy as np, gaps; "
+            "gaps.projection_profile(np.zeros((64, 64), np.uint8), coarse_factor=8); "
+            "sys.exit('scipy' in sys.modules)")
+    assert subprocess.run([sys.executable, '-c', code], cwd=ROOT).returncode == 0
@@ -0,0 +1,10 @@
+from scipy import ndimage
+
+from benchmark_extraction import count_components, make_sheet
+
+def test_reported_components_are_measured():
+    sheet = make_sheet(256, 400)
+    count = count_components(sheet)
+    assert count == ndimage.label(sheet[:, :, 3] > 50)[1]
+    # Specks land on each other on a small sheet, so the request is not met
+    assert 14 < count < 400
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from PIL import Image
+from scipy import ndimage
+
+from components import component_stats, find_components
+from conftest import SAMPLE_SHEET, draw_grid_sheet, draw_sheet
+from extract_individual import find_individual_objects
+from extract_ornaments import find_bounding_boxes
+
+def baseline_individual_objects(img_array, min_size=30, threshold=50, padding=2):
+    """The per-label mask loop find_individual_objects replaced"""
+    alpha = img_array[:, :, 3]
+    height, width = alpha.shape
+    labeled, count = ndimage.label(alpha > threshold)
+    regions = []
+    for label in range(1, count + 1):
+        component = labeled == label
+        pixels = np.sum(component)
+        if pixels > min_size:
+            coords = np.argwhere(component)
+            min_y, min_x = coords.min(axis=0)
+            max_y, max_x = coords.max(axis=0)
+            regions.append((max(0, min_x - padding), max(0, min_y - padding),
+                            min(width - 1, max_x + padding) + 1, min(height - 1, max_y + padding) + 1, pixels))
+    regions.sort(key=lambda r: (r[1], r[0]))
+    return regions
+
+def baseline_bounding_boxes(image_array, threshold=10, padding=5):
+    """The per-label loop extract_ornaments.find_bounding_boxes replaced"""
+    alpha = image_array[:, :, 3]
+    height, width = alpha.shape
+    labeled, count = ndimage.label(alpha > threshold)
+    boxes = []
+    for label in range(1, count + 1):
+        component = labeled == label
+        rows = np.where(np.any(component, axis=1))[0]
+        cols = np.where(np.any(component, axis=0))[0]
+        if len(rows) > 10 and len(cols) > 10:
+            boxes.append((max(0, cols[0] - padding), max(0, rows[0] - padding),
+                          min(width, cols[-1] + padding), min(height, rows[-1] + padding)))
+    return boxes
+
+def sheets():
+    with Image.open(SAMPLE_SHEET) as img:
+        sample = np.array(img.convert('RGBA'))
+    return [np.array(draw_sheet(seed=seed)) for seed in range(3)] + [np.array(draw_grid_sheet()), sample]
+
+@pytest.mark.parametrize('sheet', sheets())
+def test_individual_objects_match_baseline(sheet):
+    for min_size, threshold in ((30, 50), (100, 10)):
+        regions = find_individual_objects(sheet, min_size=min_size, threshold=threshold)
+        found = [box + (pixels,) for box, pixels in zip(regions.boxes(), regions['pixels'].tolist())]
+        assert found == baseline_individual_objects(sheet, min_size, threshold)
+
+@pytest.mark.parametrize('sheet', sheets())
+def test_bounding_boxes_match_baseline(sheet):
+    assert find_bounding_boxes(sheet).boxes() == baseline_bounding_boxes(sheet)
+
+def test_component_stats_match_per_label_masks():
+    mask = np.asarray(draw_sheet(seed=4))[:, :, 3] > 0
+    labeled, count, stats = find_components(mask)
+    assert count == ndimage.label(mask)[1]
+    for idx in range(count):
+        ys, xs = np.nonzero(labeled == idx + 1)
+        assert (stats['top'][idx], stats['bottom'][idx]) == (ys.min(), ys.max())
+        assert (stats['left'][idx], stats['right'][idx]) == (xs.min(), xs.max())
+        assert stats['pixels'][idx] == len(ys)
+        assert stats['cy'][idx] == pytest.approx(ys.mean())
+        assert stats['cx'][idx] == pytest.approx(xs.mean())
+
+def test_first_pixels_follow_label_order():
+    labeled, count = ndimage.label(np.asarray(draw_sheet(seed=5))[:, :, 3] > 50)
+    first = component_stats(labeled, count, first_pixels=True)['first']
+    expected = [np.flatnonzero(labeled.ravel() == label)[0] for label in range(1, count + 1)]
+    assert first.tolist() == expected
+    assert np.all(np.diff(first) > 0)
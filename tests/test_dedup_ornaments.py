@@ -0,0 +1,22 @@
+import os
+
+from PIL import Image
+
+from dedup_ornaments import apply_dedup
+
+def test_colliding_duplicates_are_all_kept(tmp_path):
+    # Three folders named 'out' so the folder prefix collides as well
+    dupes = []
+    for idx, parent in enumerate(('a/out', 'b/out', 'c/out')):
+        os.makedirs(tmp_path / parent)
+        path = str(tmp_path / parent / 'ornament-1.png')
+        Image.new('RGBA', (4, 4), (idx * 80, 0, 0, 255)).save(path)
+        dupes.append(path)
+    duplicates_dir = tmp_path / 'duplicates'
+
+    apply_dedup({'canonical.png': dupes}, str(duplicates_dir))
+
+    assert sorted(os.listdir(duplicates_dir)) == ['ornament-1.png', 'out-ornament-1-2.png', 'out-ornament-1.png']
+    colors = {Image.open(duplicates_dir / name).getpixel((0, 0))[0] for name in os.listdir(duplicates_dir)}
+    assert colors == {0, 80, 160}
+    assert not any(os.path.exists(path) for path in dupes)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from analyze_ornaments import analyze_image_structure
+from conftest import SAMPLE_SHEET, draw_grid_sheet, draw_sheet
+from extract_smart import find_content_regions, find_regions_in_alpha
+from gaps import interior_gaps, projection_profile
+
+def baseline_gaps(counts):
+    """The row/column scan analyze_ornaments used before gaps.py"""
+    gaps = []
+    in_gap = True
+    gap_start = 0
+    for y, count in enumerate(counts):
+        if count < 10:
+            if not in_gap:
+                in_gap = True
+                gap_start = y
+        else:
+            if in_gap and gap_start > 0:
+                gaps.append((gap_start, y))
+            in_gap = False
+    return gaps
+
+def group_boundaries(gaps, length, midpoints):
+    """The consecutive-gap grouping extract_smart used before gaps.py"""
+    boundaries = [0]
+    if gaps:
+        prev = gap_start = gaps[0]
+        for gap in gaps[1:]:
+            if gap - prev > 1:
+                if midpoints:
+                    boundaries.append((gap_start + prev) // 2)
+                    gap_start = gap
+                else:
+                    boundaries.append(prev)
+                    boundaries.append(gap)
+            prev = gap
+        boundaries.append((gap_start + prev) // 2 if midpoints else gaps[-1])
+    boundaries.append(length)
+    return sorted(set(boundaries))
+
+def baseline_content_regions(alpha):
+    """The per-row and per-column loops of extract_smart.find_content_regions"""
+    height, width = alpha.shape
+    h_gaps = [y for y in range(height - 1) if np.sum(alpha[y, :] > 50) < 10]
+    h_boundaries = group_boundaries(h_gaps, height, midpoints=False)
+    regions = []
+    for top, bottom in zip(h_boundaries, h_boundaries[1:]):
+        if bottom - top < 50:
+            continue
+        col_content = np.sum(alpha[top:bottom, :] > 50, axis=0)
+        v_gaps = [x for x in range(width) if col_content[x] < 5]
+        v_boundaries = group_boundaries(v_gaps, width, midpoints=True)
+        regions.extend((left, top, right, bottom) for left, right in zip(v_boundaries, v_boundaries[1:])
+                       if right - left >= 30)
+    return regions
+
+def alphas():
+    with Image.open(SAMPLE_SHEET) as img:
+        sample = np.asarray(img.convert('RGBA'))[:, :, 3]
+    return [np.asarray(draw_grid_sheet(seed=seed))[:, :, 3] for seed in range(3)] + [
+        np.asarray(draw_sheet(size=(300, 200)))[:, :, 3], sample]
+
+@pytest.mark.parametrize('alpha', alphas())
+def test_content_regions_match_baseline(alpha):
+    assert find_regions_in_alpha(alpha).boxes() == baseline_content_regions(alpha)
+
+@pytest.mark.parametrize('alpha', alphas())
+def test_interior_gaps_match_baseline(alpha):
+    for axis in (0, 1):
+        counts = projection_profile(alpha, threshold=50, axis=axis)
+        assert interior_gaps(counts, max_content=10) == baseline_gaps(counts)
+
+def test_analyze_and_extract_read_the_same_sheet(tmp_path):
+    path = str(tmp_path / 'grid.png')
+    draw_grid_sheet().save(path)
+    row_gaps, col_gaps = analyze_image_structure(path)
+    assert (len(row_gaps), len(col_gaps)) == (1, 3)
+    assert len(find_content_regions(path)) == 8
+    assert find_content_regions(path, plane_dir=str(tmp_path / 'planes')).boxes() == \
+        find_content_regions(path).boxes()
@@ -0,0 +1,57 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import manifest
+from conftest import SAMPLE_SHEET
+from extract_individual import separate_all_ornaments
+from png_optimizer import optimize_files
+
+def alpha_count(path, threshold):
+    with Image.open(path) as img:
+        return int(np.count_nonzero(np.asarray(img.convert('RGBA'))[:, :, 3] > threshold))
+
+def read_entries(output_dir):
+    with open(os.path.join(output_dir, manifest.MANIFEST_NAME)) as f:
+        return json.load(f)['ornaments']
+
+def test_crop_fields_count_pixels_above_threshold():
+    pixels = np.zeros((4, 5, 4), dtype=np.uint8)
+    pixels[..., 3] = np.arange(20).reshape(4, 5) * 10
+    crop = Image.fromarray(pixels, 'RGBA')
+    assert manifest.crop_fields(crop) == {'width': 5, 'height': 4, 'pixels': 19, 'alpha_threshold': 0}
+    assert manifest.crop_fields(crop, 50)['pixels'] == 14
+    assert manifest.crop_fields(crop.convert('RGB'), 50)['pixels'] == 20
+
+def test_entries_use_the_extractor_threshold(tmp_path):
+    output_dir = str(tmp_path)
+    separate_all_ornaments(SAMPLE_SHEET, output_dir, threshold=128)
+    entries = read_entries(output_dir)
+    assert len(entries) == 14
+    for entry in entries:
+        assert entry['alpha_threshold'] == 128
+        assert entry['pixels'] == alpha_count(os.path.join(output_dir, entry['file']), 128)
+
+def test_optimizer_recounts_with_the_entry_threshold(tmp_path):
+    output_dir = str(tmp_path)
+    separate_all_ornaments(SAMPLE_SHEET, output_dir, threshold=128)
+    paths = [os.path.join(output_dir, entry['file']) for entry in read_entries(output_dir)][:3]
+    records = optimize_files(paths, max_error=8, cache_dir=None)['results']
+    assert any(record['mode'] != 'unchanged' for record in records)
+    for entry in read_entries(output_dir):
+        assert entry['pixels'] == alpha_count(os.path.join(output_dir, entry['file']), 128)
+
+def add_entries(output_dir, source, count):
+    for idx in range(count):
+        entry = {'file': f"{source}-{idx}.png", 'source': source, 'strategy': 'test'}
+        manifest.update_manifest(output_dir, f"{source}-{idx}.png", 'test', [entry])
+
+def test_concurrent_updates_keep_every_entry(tmp_path):
+    output_dir = str(tmp_path)
+    sources = [f"sheet{n}" for n in range(6)]
+    with ProcessPoolExecutor(max_workers=len(sources)) as executor:
+        list(executor.map(add_entries, [output_dir] * len(sources), sources, [25] * len(sources)))
+    assert len(read_entries(output_dir)) == len(sources) * 25
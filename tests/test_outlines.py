@@ -0,0 +1,59 @@
+import base64
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from conftest import draw_sheet
+from outlines import boundary_rings, hit_mask, ornament_shape, outline
+
+def ring_area(ring):
+    x, y = np.asarray(ring, dtype=np.float64).reshape(-1, 2).T
+    return (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+def masks():
+    rng = np.random.default_rng(3)
+    yield np.ones((1, 1), dtype=bool)
+    yield np.eye(6, dtype=bool)  # pixels touching only at corners
+    ring = np.ones((9, 9), dtype=bool)
+    ring[3:6, 3:6] = False
+    ring[4, 4] = True  # an island inside a hole
+    yield ring
+    for _ in range(5):
+        yield rng.random((23, 31)) < 0.45
+    yield np.asarray(draw_sheet(seed=1))[:, :, 3] > 50
+
+@pytest.mark.parametrize('mask', list(masks()))
+def test_ring_areas_add_up_to_pixel_count(mask):
+    rings, areas = boundary_rings(mask)
+    assert sum(areas) == mask.sum()
+    assert [ring_area(ring) for ring in rings] == pytest.approx(list(areas))
+
+@pytest.mark.parametrize('mask', list(masks()))
+def test_one_ring_per_component_and_hole(mask):
+    _, areas = boundary_rings(mask)
+    # Foreground is 4-connected, so pixels touching at a corner are separate
+    # components and the background around them is 8-connected
+    holes = ndimage.label(~np.pad(mask, 1), structure=np.ones((3, 3)))[1] - 1
+    assert sum(1 for area in areas if area > 0) == ndimage.label(mask)[1]
+    assert sum(1 for area in areas if area < 0) == holes
+
+def test_tiny_ornament_keeps_an_outline():
+    shapes = outline(np.ones((1, 1), dtype=bool))
+    assert shapes == [[0, 0, 1, 0, 1, 1, 0, 1]]
+
+def test_hit_mask_bits_cover_the_mask():
+    mask = np.asarray(draw_sheet(seed=2))[:, :, 3] > 50
+    fields = hit_mask(mask, cell=4)
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(fields['bits']), dtype=np.uint8))
+    grid = bits.reshape(fields['height'], fields['row_bytes'] * 8)[:, :fields['width']].astype(bool)
+    for y, x in zip(*np.nonzero(mask)):
+        assert grid[y // 4, x // 4]
+    assert grid.sum() == len({(y // 4, x // 4) for y, x in zip(*np.nonzero(mask))})
+
+def test_simplified_outline_stays_close_to_the_mask():
+    yy, xx = np.mgrid[:60, :80]
+    mask = np.hypot(xx - 40, (yy - 30) * 1.3) < 25
+    shape = ornament_shape(mask, tolerance=1.0)
+    assert len(shape['outline']) == 1
+    assert ring_area(shape['outline'][0]) == pytest.approx(mask.sum(), rel=0.03)
@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import numpy as np
+from PIL import Image
+
+import plane_cache
+from conftest import SAMPLE_SHEET
+
+def test_planes_match_decoded_sheet(sheet_path, tmp_path):
+    alpha, rgba = plane_cache.load_planes(sheet_path, str(tmp_path / 'planes'), rgba=True)
+    with Image.open(sheet_path) as img:
+        expected = np.asarray(img.convert('RGBA'))
+    assert np.array_equal(rgba, expected)
+    assert np.array_equal(alpha, expected[:, :, 3])
+
+def test_planes_larger_than_max_bytes_survive_eviction(tmp_path):
+    sheet = str(tmp_path / 'sheet.png')
+    shutil.copy(SAMPLE_SHEET, sheet)
+    plane_dir = str(tmp_path / 'planes')
+
+    alpha, rgba = plane_cache.load_planes(sheet, plane_dir, rgba=True, max_bytes=5_000_000)
+
+    assert rgba.nbytes > 5_000_000
+    assert alpha.shape == rgba.shape[:2]
+
+def test_eviction_drops_least_recently_used_sheet(tmp_path):
+    plane_dir = str(tmp_path / 'planes')
+    first, second = str(tmp_path / 'a.png'), str(tmp_path / 'b.png')
+    Image.new('RGBA', (400, 400), (0, 0, 0, 255)).save(first)
+    Image.new('RGBA', (400, 400), (0, 0, 0, 128)).save(second)
+
+    plane_cache.load_planes(first, plane_dir, max_bytes=200_000)
+    os.utime(os.path.join(plane_dir, os.listdir(plane_dir)[0]), ns=(0, 0))
+    plane_cache.load_planes(second, plane_dir, max_bytes=200_000)
+
+    remaining = os.listdir(plane_dir)
+    assert len(remaining) == 1
+    assert np.all(plane_cache.load_alpha(second, plane_dir) == 128)
+
+def test_alpha_plane_is_written_without_rgba_plane(tmp_path):
+    sheet = str(tmp_path / 'sheet.png')
+    Image.open(SAMPLE_SHEET).convert('P').save(sheet)
+    plane_dir = str(tmp_path / 'planes')
+
+    alpha = plane_cache.load_alpha(sheet, plane_dir)
+
+    assert [name.split('.')[1] for name in os.listdir(plane_dir)] == ['alpha']
+    with Image.open(sheet) as img:
+        assert np.array_equal(alpha, np.asarray(img.convert('RGBA'))[:, :, 3])
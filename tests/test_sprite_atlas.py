@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from sprite_atlas import MaxRectsBin, build_atlas, pack_sizes
+
+def overlapping(a, b):
+    (ax, ay, aw, ah), (bx, by, bw, bh) = a, b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+def random_sizes(seed, count=120, largest=90):
+    rng = np.random.default_rng(seed)
+    return [tuple(int(v) for v in rng.integers(1, largest, 2)) for _ in range(count)]
+
+@pytest.mark.parametrize('seed', range(4))
+def test_maxrects_placements_stay_apart_and_inside(seed):
+    packer = MaxRectsBin(256, 512)
+    placed = []
+    for w, h in random_sizes(seed):
+        position = packer.insert(w, h)
+        if position is not None:
+            placed.append((position[0], position[1], w, h))
+    assert len(placed) > 20
+    for i, rect in enumerate(placed):
+        x, y, w, h = rect
+        assert 0 <= x and 0 <= y and x + w <= 256 and y + h <= 512
+        assert not any(overlapping(rect, other) for other in placed[:i])
+
+@pytest.mark.parametrize('seed', range(4))
+def test_pack_sizes_places_everything_without_overlap(seed):
+    sizes = random_sizes(seed, count=200, largest=150)
+    sheets, placements = pack_sizes(sizes, max_size=600, padding=2)
+    assert sorted(placements) == list(range(len(sizes)))
+    by_sheet = {}
+    for idx, (sheet, x, y) in placements.items():
+        w, h = sizes[idx]
+        width, height = sheets[sheet]
+        assert x + w + 2 <= width and y + h + 2 <= height
+        by_sheet.setdefault(sheet, []).append((x, y, w + 2, h + 2))
+    for rects in by_sheet.values():
+        for i, rect in enumerate(rects):
+            assert not any(overlapping(rect, other) for other in rects[:i])
+
+def test_oversized_sprite_is_rejected():
+    with pytest.raises(ValueError):
+        pack_sizes([(10, 10), (600, 20)], max_size=600, padding=2)
+
+def test_same_file_names_from_different_folders_keep_their_frames(tmp_path):
+    paths = []
+    for folder, color in (('sheet-a', (255, 0, 0, 255)), ('sheet-b', (0, 0, 255, 255))):
+        os.makedirs(tmp_path / folder)
+        paths.append(str(tmp_path / folder / 'ornament-1.png'))
+        Image.new('RGBA', (12, 9), color).save(paths[-1])
+
+    atlas = build_atlas(paths, str(tmp_path / 'atlas'))
+
+    assert sorted(atlas['frames']) == ['sheet-a/ornament-1.png', 'sheet-b/ornament-1.png']
+    with open(tmp_path / 'atlas' / 'atlas.json') as f:
+        assert json.load(f) == atlas
+    with Image.open(tmp_path / 'atlas' / atlas['sheets'][0]['file']) as sheet:
+        for path, (frame_name, frame) in zip(paths, sorted(atlas['frames'].items())):
+            box = (frame['x'], frame['y'], frame['x'] + frame['w'], frame['y'] + frame['h'])
+            with Image.open(path) as sprite:
+                assert sheet.crop(box).tobytes() == sprite.tobytes()
+
+def test_single_folder_keeps_plain_file_names(tmp_path):
+    paths = [str(tmp_path / f"ornament-{n}.png") for n in (1, 2)]
+    for path in paths:
+        Image.new('RGBA', (5, 5), (0, 255, 0, 255)).save(path)
+    assert sorted(build_atlas(paths, str(tmp_path / 'atlas'))['frames']) == ['ornament-1.png', 'ornament-2.png']
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from conftest import draw_sheet
+from threshold_sweep import sweep_components, sweep_sheet
+
+MIN_SIZES = (0, 10, 100)
+
+def labeled_summary(alpha, threshold):
+    labeled, count = ndimage.label(alpha > threshold)
+    sizes = np.bincount(labeled.ravel(), minlength=count + 1)[1:]
+    return {
+        'threshold': threshold,
+        'foreground': int(sizes.sum()),
+        'largest': int(sizes.max()) if count else 0,
+        'components': {m: int(np.count_nonzero(sizes > m)) for m in MIN_SIZES},
+    }
+
+@pytest.mark.parametrize('seed', range(4))
+def test_sweep_matches_ndimage_label(seed):
+    alpha = np.asarray(draw_sheet(seed=seed, blobs=40))[:, :, 3]
+    thresholds = [0, 1, 10, 50, 128, 200, 254]
+    results = sweep_components(alpha, thresholds, MIN_SIZES)
+    assert results == [labeled_summary(alpha, t) for t in thresholds]
+
+def test_sweep_on_noise_merges_across_thresholds():
+    # Random alpha connects pixels through many lower-threshold bridges
+    alpha = np.random.default_rng(7).integers(0, 256, (90, 70)).astype(np.uint8)
+    thresholds = list(range(0, 256, 15))
+    assert sweep_components(alpha, thresholds, MIN_SIZES) == [labeled_summary(alpha, t) for t in thresholds]
+
+def test_sweep_edge_cases():
+    empty = np.zeros((5, 6), dtype=np.uint8)
+    assert sweep_components(empty, [0, 50], MIN_SIZES) == [labeled_summary(empty, 0), labeled_summary(empty, 50)]
+    with pytest.raises(ValueError):
+        sweep_components(empty, [50, 300])
+
+def test_sweep_sheet_reads_plane_cache(sheet_path, tmp_path):
+    direct = sweep_sheet(sheet_path, thresholds=[10, 50], min_sizes=[0])
+    assert sweep_sheet(sheet_path, thresholds=[10, 50], min_sizes=[0], plane_dir=str(tmp_path / 'planes')) == direct
@@ -0,0 +1,62 @@
+import filecmp
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+from scipy import ndimage
+
+from components import component_stats
+from conftest import SAMPLE_SHEET, draw_sheet
+from extract_individual import find_individual_objects, separate_all_ornaments
+from tiled_segmentation import array_strip_reader, find_individual_objects_tiled, label_strips
+
+STRIP_HEIGHTS = [1, 2, 7, 64, 10000]
+
+@pytest.mark.parametrize('strip_height', STRIP_HEIGHTS)
+def test_label_strips_match_full_labeling(strip_height):
+    for seed in range(3):
+        alpha = np.asarray(draw_sheet(seed=seed, blobs=40))[:, :, 3]
+        height, width = alpha.shape
+        stats = label_strips(array_strip_reader(alpha), width, height, strip_height, threshold=50)
+        expected = component_stats(*ndimage.label(alpha > 50))
+        for name in ('top', 'left', 'bottom', 'right', 'pixels'):
+            assert np.array_equal(stats[name], expected[name]), name
+
+def test_label_strips_join_shapes_spanning_many_strips():
+    # A ring whose sides cross every strip edge, around a separate bar
+    alpha = np.zeros((40, 30), dtype=np.uint8)
+    alpha[:, 2] = alpha[:, 27] = 255
+    alpha[0, 2:28] = alpha[39, 2:28] = 255
+    alpha[5:35, 14] = 255
+    stats = label_strips(array_strip_reader(alpha), 30, 40, strip_height=3, threshold=50)
+    assert stats['pixels'].tolist() == [int((alpha > 50).sum()) - 30, 30]
+    assert stats['bottom'].tolist() == [39, 34]
+
+@pytest.mark.parametrize('strip_height', [5, 64, 10000])
+def test_tiled_regions_match_full_regions(strip_height):
+    with Image.open(SAMPLE_SHEET) as img:
+        sheet = img.convert('RGBA')
+    expected = find_individual_objects(np.asarray(sheet), min_size=100)
+    for source in (sheet, SAMPLE_SHEET, np.asarray(sheet)[:, :, 3]):
+        regions = find_individual_objects_tiled(source, min_size=100, strip_height=strip_height)
+        assert regions.boxes() == expected.boxes()
+        assert np.array_equal(regions['pixels'], expected['pixels'])
+
+def test_strip_mode_writes_the_same_files(tmp_path):
+    full, strips = str(tmp_path / 'full'), str(tmp_path / 'strips')
+    separate_all_ornaments(SAMPLE_SHEET, full, outlines=True)
+    separate_all_ornaments(SAMPLE_SHEET, strips, strip_height=100, plane_dir=str(tmp_path / 'planes'),
+                           outlines=True)
+
+    names = sorted(name for name in os.listdir(full) if name.endswith('.png'))
+    assert len(names) == 14
+    assert sorted(name for name in os.listdir(strips) if name.endswith('.png')) == names
+    assert all(filecmp.cmp(os.path.join(full, n), os.path.join(strips, n), shallow=False) for n in names)
+    with open(os.path.join(full, 'ornaments.json')) as a, open(os.path.join(strips, 'ornaments.json')) as b:
+        assert json.load(a)['ornaments'] == json.load(b)['ornaments']
+
+def test_strip_mode_cannot_be_hierarchical(tmp_path):
+    with pytest.raises(ValueError):
+        separate_all_ornaments(SAMPLE_SHEET, str(tmp_path), strip_height=100, hierarchical=True)
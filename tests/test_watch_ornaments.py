@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+import watch_ornaments
+from conftest import draw_grid_sheet
+
+def write_sheet(path, extra_blob=False):
+    pixels = np.array(draw_grid_sheet())
+    if extra_blob:
+        # Fits in the empty band below the grid
+        pixels[172:184, 120:150] = (200, 30, 30, 255)
+    Image.fromarray(pixels, 'RGBA').save(path)
+
+def run(sheet, output_root):
+    state = watch_ornaments.load_state(output_root)
+    output_dir = watch_ornaments.sheet_output_dir(output_root, sheet)
+    entry, counts = watch_ornaments.update_sheet(sheet, output_dir, state.get(sheet), min_size=100)
+    state[sheet] = entry
+    os.makedirs(output_root, exist_ok=True)
+    watch_ornaments.save_state(output_root, state)
+    return output_dir, counts
+
+def snapshot(output_dir):
+    return {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+            for name in os.listdir(output_dir) if name.endswith('.png')}
+
+def test_incremental_reruns(tmp_path):
+    sheet, root = str(tmp_path / 'sheet.png'), str(tmp_path / 'out')
+    write_sheet(sheet)
+
+    output_dir, counts = run(sheet, root)
+    assert counts == {'written': 8, 'unchanged': 0, 'removed': 0}
+    before = snapshot(output_dir)
+
+    # Nothing changed: the state short-circuits the run
+    assert run(sheet, root)[1] == {'written': 0, 'unchanged': 8, 'removed': 0}
+
+    # One new ornament: the others keep their names and files
+    write_sheet(sheet, extra_blob=True)
+    counts = run(sheet, root)[1]
+    assert counts == {'written': 1, 'unchanged': 8, 'removed': 0}
+    after = snapshot(output_dir)
+    assert set(after) - set(before) == {'ornament-9.png'}
+    assert all(after[name] == mtime for name, mtime in before.items())
+
+    # And removing it deletes just that file
+    write_sheet(sheet)
+    assert run(sheet, root)[1] == {'written': 0, 'unchanged': 8, 'removed': 1}
+    assert snapshot(output_dir) == before
+    with open(os.path.join(output_dir, 'ornaments.json')) as f:
+        assert len(json.load(f)['ornaments']) == 8
+
+def test_deleted_output_is_rewritten(tmp_path):
+    sheet, root = str(tmp_path / 'sheet.png'), str(tmp_path / 'out')
+    write_sheet(sheet)
+    output_dir, _ = run(sheet, root)
+    os.remove(os.path.join(output_dir, 'ornament-3.png'))
+
+    assert run(sheet, root)[1] == {'written': 1, 'unchanged': 7, 'removed': 0}
+    assert os.path.exists(os.path.join(output_dir, 'ornament-3.png'))
+
+def test_assign_file_names_keeps_names_by_box():
+    old = [{'file': 'ornament-1.png', 'box': [0, 0, 5, 5]}, {'file': 'ornament-3.png', 'box': [9, 9, 20, 20]}]
+    boxes = [(1, 1, 4, 4), (9, 9, 20, 20), (30, 30, 40, 40)]
+    # Only the unmoved box keeps its name, new boxes take the lowest free ones
+    assert watch_ornaments.assign_file_names(boxes, old) == ['ornament-1.png', 'ornament-3.png', 'ornament-2.png']
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Sweep alpha thresholds and minimum sizes in one labeling pass
+Thresholds are visited from high to low; lowering the threshold only
+activates new pixels, which are unioned into the components found at the
+previous threshold instead of relabeling the whole sheet
+"""
+
+import argparse
+import json
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+import plane_cache
+
+DEFAULT_THRESHOLDS = (10, 50, 128)
+DEFAULT_MIN_SIZES = (30, 100)
+
+def _roots(parent, nodes):
+    """Follow parent pointers until every node is a root"""
+    while True:
+        up = parent[nodes]
+        if np.array_equal(up, nodes):
+            return nodes
+        nodes = up
+
+def _summary(threshold, sizes, min_sizes):
+    component_sizes = sizes[sizes > 0]
+    return {
+        'threshold': threshold,
+        'foreground': int(component_sizes.sum()),
+        'largest': int(component_sizes.max()) if len(component_sizes) else 0,
+        'components': {int(m): int(np.count_nonzero(component_sizes > m)) for m in min_sizes},
+    }
+
+def sweep_components(alpha, thresholds, min_sizes=(0,)):
+    """
+    Component counts of alpha > t for every threshold t, 4-connected like
+    ndimage.label.
+
+    Thresholds are visited from high to low. The highest one is labeled with
+    ndimage.label and its components seed a union-find; every pixel activated
+    by a lower threshold becomes a node, and only the edges touching those new
+    pixels are merged (with csgraph on the roots involved). Returns one dict
+    per threshold, lowest first, with the component count above each min_size
+    and the largest component.
+    """
+    alpha = np.asarray(alpha)
+    height, width = alpha.shape
+    flat = alpha.ravel()
+    thresholds = sorted(set(int(t) for t in thresholds), reverse=True)
+    if thresholds and not 0 <= thresholds[-1] <= thresholds[0] <= 255:
+        raise ValueError(f"Alpha thresholds must be in 0-255: {thresholds}")
+    results = []
+
+    for step, threshold in enumerate(thresholds):
+        if step == 0:
+            # The highest threshold is labeled outright and seeds the union-find
+            labels, num_features = ndimage.label(alpha > threshold)
+            node_of = labels.ravel().astype(np.int64)   # 0 = inactive
+            del labels
+            parent = np.arange(num_features + 1, dtype=np.int64)
+            sizes = np.bincount(node_of, minlength=num_features + 1)
+            sizes[0] = 0
+            results.append(_summary(threshold, sizes, min_sizes))
+            continue
+
+        # Only pixels with previous >= alpha > threshold are activated
+        new = np.flatnonzero((flat > threshold) & (flat <= thresholds[step - 1]))
+        first = len(parent)
+        new_nodes = np.arange(first, first + len(new))
+        node_of[new] = new_nodes
+        parent = np.concatenate((parent, new_nodes))
+        sizes = np.concatenate((sizes, np.ones(len(new), dtype=np.int64)))
+
+        # Edges from each new pixel to its active 4-neighbours
+        ys, xs = np.divmod(new, width)
+        sources, targets = [], []
+        for valid, offset in ((xs > 0, -1), (xs < width - 1, 1), (ys > 0, -width), (ys < height - 1, width)):
+            neighbour_nodes = node_of[new[valid] + offset]
+            active = neighbour_nodes > 0
+            sources.append(new_nodes[valid][active])
+            targets.append(neighbour_nodes[active])
+        sources = _roots(parent, np.concatenate(sources))
+        targets = _roots(parent, np.concatenate(targets))
+
+        # Merge the roots involved on a compact graph (the node space is only
+        # the seed components plus activated pixels, so a dense index is cheap)
+        ends = np.concatenate((sources, targets))
+        is_involved = np.zeros(len(parent), dtype=bool)
+        is_involved[ends] = True
+        involved = np.flatnonzero(is_involved)
+        if len(involved):
+            local_of = np.zeros(len(parent), dtype=np.int64)
+            local_of[involved] = np.arange(len(involved))
+            local = local_of[ends]
+            half = len(sources)
+            graph = coo_matrix((np.ones(half, dtype=np.int8), (local[:half], local[half:])),
+                               shape=(len(involved), len(involved)))
+            num_groups, group = connected_components(graph, directed=False)
+            representative = np.full(num_groups, len(parent), dtype=np.int64)
+            np.minimum.at(representative, group, involved)
+            merged_sizes = np.bincount(group, weights=sizes[involved], minlength=num_groups).astype(np.int64)
+            parent[involved] = representative[group]
+            sizes[involved] = 0
+            sizes[representative] = merged_sizes
+
+        results.append(_summary(threshold, sizes, min_sizes))
+
+    return results[::-1]
+
+def sweep_sheet(input_path, thresholds=DEFAULT_THRESHOLDS, min_sizes=DEFAULT_MIN_SIZES, plane_dir=None):
+    """Decode a sheet's alpha once (or map it from plane_dir) and sweep it"""
+    if plane_dir:
+        alpha = plane_cache.load_alpha(input_path, plane_dir)
+    else:
+        with Image.open(input_path) as img:
+            alpha = np.asarray(img.getchannel('A') if 'A' in img.getbands() else img.convert('RGBA').getchannel('A'))
+    return sweep_components(alpha, thresholds, min_sizes)
+
+def print_sweep(results):
+    min_sizes = list(results[0]['components']) if results else []
+    header = f"{'threshold':>9}  {'foreground':>10}  {'largest':>8}" + ''.join(f"  {f'>{m}px':>8}" for m in min_sizes)
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(f"{row['threshold']:>9}  {row['foreground']:>10}  {row['largest']:>8}"
+              + ''.join(f"  {row['components'][m]:>8}" for m in min_sizes))
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count regions for many alpha thresholds and minimum sizes at once")
+    parser.add_argument('input')
+    parser.add_argument('--thresholds', type=_int_list, default=list(DEFAULT_THRESHOLDS),
+                        help="comma-separated alpha thresholds (pixels with alpha > t are content)")
+    parser.add_argument('--min-sizes', type=_int_list, default=list(DEFAULT_MIN_SIZES),
+                        help="comma-separated minimum component sizes in pixels")
+    parser.add_argument('--plane-dir', default=None, help="read the alpha plane from this memory-mapped plane cache")
+    parser.add_argument('-o', '--output', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = sweep_sheet(args.input, args.thresholds, args.min_sizes, args.plane_dir)
+    print_sweep(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
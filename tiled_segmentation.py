@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tiled connected-component segmentation for very large sheets
+Labels the alpha channel in horizontal strips and merges components that
+cross strip boundaries, so only one strip of masks and labels is alive at once
+"""
+
+from PIL import Image
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from components import component_stats
+from extract_individual import regions_from_stats
+
+def alpha_plane(img):
+    """
+    Single-channel alpha image of a sheet (1 byte per pixel).
+
+    The RGBA decode is dropped as soon as the alpha band is extracted.
+    """
+    if 'A' not in img.getbands():
+        img = img.convert('RGBA')
+    return img.getchannel('A')
+
+def pil_strip_reader(alpha_img):
+    """Strip reader for a PIL alpha image: read(top, bottom) -> uint8 array"""
+    width = alpha_img.size[0]
+    return lambda top, bottom: np.asarray(alpha_img.crop((0, top, width, bottom)))
+
+def array_strip_reader(alpha_array):
+    """Strip reader for a 2D alpha array or np.memmap"""
+    return lambda top, bottom: np.asarray(alpha_array[top:bottom])
+
+def label_strips(read_strip, width, height, strip_height=1024, threshold=50):
+    """
+    Label the sheet strip by strip and merge components across strip edges.
+
+    Returns per-component arrays (top, left, bottom, right with inclusive
+    bounds, and pixels), matching a single ndimage.label over the whole sheet.
+    """
+    tops, lefts, bottoms, rights, pixels = [], [], [], [], []
+    edges_a, edges_b = [], []
+    offset = 0
+    prev_last_row = None
+
+    for strip_top in range(0, height, strip_height):
+        strip_bottom = min(height, strip_top + strip_height)
+        mask = read_strip(strip_top, strip_bottom) > threshold
+        labeled, num_features = ndimage.label(mask)
+        del mask
+
+        stats = component_stats(labeled, num_features)
+        tops.append(stats['top'] + strip_top)
+        bottoms.append(stats['bottom'] + strip_top)
+        lefts.append(stats['left'])
+        rights.append(stats['right'])
+        pixels.append(stats['pixels'])
+
+        # Global ids for this strip's labels, 0 stays background
+        first_row = np.where(labeled[0] > 0, labeled[0] + offset, 0)
+        if prev_last_row is not None:
+            touching = (prev_last_row > 0) & (first_row > 0)
+            if touching.any():
+                pairs = np.unique(np.stack([prev_last_row[touching], first_row[touching]], axis=1), axis=0)
+                edges_a.append(pairs[:, 0])
+                edges_b.append(pairs[:, 1])
+
+        prev_last_row = np.where(labeled[-1] > 0, labeled[-1] + offset, 0)
+        offset += num_features
+        del labeled
+
+    if offset == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {'top': empty, 'left': empty, 'bottom': empty, 'right': empty, 'pixels': empty}
+
+    tops = np.concatenate(tops)
+    lefts = np.concatenate(lefts)
+    bottoms = np.concatenate(bottoms)
+    rights = np.concatenate(rights)
+    pixels = np.concatenate(pixels)
+
+    # Union the strip components that touch across boundaries (ids are 1-based)
+    if edges_a:
+        a = np.concatenate(edges_a) - 1
+        b = np.concatenate(edges_b) - 1
+    else:
+        a = b = np.zeros(0, dtype=np.int64)
+    graph = coo_matrix((np.ones(len(a), dtype=np.int8), (a, b)), shape=(offset, offset))
+    num_merged, group = connected_components(graph, directed=False)
+
+    # Merged components are numbered in order of their first strip label, which
+    # is the same raster order a whole-sheet ndimage.label would produce
+    _, first_seen = np.unique(group, return_index=True)
+    rank = np.empty(num_merged, dtype=np.int64)
+    rank[np.argsort(first_seen, kind='stable')] = np.arange(num_merged)
+    group = rank[group]
+
+    merged_top = np.full(num_merged, height, dtype=np.int64)
+    merged_left = np.full(num_merged, width, dtype=np.int64)
+    merged_bottom = np.full(num_merged, -1, dtype=np.int64)
+    merged_right = np.full(num_merged, -1, dtype=np.int64)
+    np.minimum.at(merged_top, group, tops)
+    np.minimum.at(merged_left, group, lefts)
+    np.maximum.at(merged_bottom, group, bottoms)
+    np.maximum.at(merged_right, group, rights)
+    merged_pixels = np.bincount(group, weights=pixels, minlength=num_merged).astype(np.int64)
+
+    return {
+        'top': merged_top,
+        'left': merged_left,
+        'bottom': merged_bottom,
+        'right': merged_right,
+        'pixels': merged_pixels,
+    }
+
+def find_individual_objects_tiled(img, min_size=30, threshold=50, padding=2, strip_height=1024):
+    """
+    Tiled equivalent of extract_individual.find_individual_objects.
+
+    Takes a PIL image, a path or a 2D alpha array (such as a memory-mapped
+    plane) instead of a full RGBA array and returns the same RegionTable.
+    """
+    if isinstance(img, np.ndarray):
+        height, width = img.shape
+        read_strip = array_strip_reader(img)
+    else:
+        if isinstance(img, str):
+            img = Image.open(img)
+        alpha_img = alpha_plane(img)
+        width, height = alpha_img.size
+        read_strip = pil_strip_reader(alpha_img)
+
+    stats = label_strips(read_strip, width, height, strip_height, threshold)
+    return regions_from_stats(stats, width, height, min_size, padding)
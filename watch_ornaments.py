@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Watch asset folders and incrementally re-extract changed sprite sheets
+Only sheets whose content hash changed are re-segmented, and only ornaments
+whose pixels changed are rewritten
+"""
+
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import time
+
+from PIL import Image
+import numpy as np
+
+import extraction_cache
+from extract_individual import find_individual_objects, save_regions
+
+DEFAULT_PATTERNS = ['assets/*.PNG', 'assets/*.png', 'assets/ornaments/orgg.PNG']
+STATE_NAME = '.watch-state.json'
+
+def load_state(output_root):
+    try:
+        with open(os.path.join(output_root, STATE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(output_root, state):
+    path = os.path.join(output_root, STATE_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def scan(patterns):
+    """Current (mtime, size) of every sheet matching the patterns"""
+    found = {}
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[os.path.abspath(path)] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+def sheet_output_dir(output_root, sheet_path):
+    return os.path.join(output_root, os.path.splitext(os.path.basename(sheet_path))[0])
+
+def pixels_digest(ornament):
+    """Hash of a crop's decoded pixels, independent of PNG encoding"""
+    digest = hashlib.sha256(f"{ornament.mode}:{ornament.size}".encode())
+    digest.update(ornament.tobytes())
+    return digest.hexdigest()
+
+def assign_file_names(boxes, old):
+    """
+    File name for each region, keeping the name of a previous region with the
+    same box so adding or removing one ornament does not rename the rest;
+    new regions take the lowest free ornament-{n}.png
+    """
+    by_box = {tuple(o['box']): o['file'] for o in old if 'box' in o}
+    names = [by_box.get(tuple(box)) for box in boxes]
+    taken = set(name for name in names if name)
+    free = (f"ornament-{n}.png" for n in itertools.count(1) if f"ornament-{n}.png" not in taken)
+    return [name or next(free) for name in names]
+
+def update_sheet(sheet_path, output_dir, previous=None, min_size=100, threshold=50, padding=2):
+    """
+    Re-extract one sheet, writing only ornaments whose pixels changed.
+
+    previous is this sheet's entry from the last run (or None). Returns the
+    new entry and counts of written, unchanged and removed files.
+    """
+    sheet_hash = extraction_cache.file_digest(sheet_path)
+    params = {'min_size': min_size, 'threshold': threshold, 'padding': padding}
+    if (previous and previous.get('sheet_hash') == sheet_hash and previous.get('params') == params
+            and 'outputs' in previous and extraction_cache.outputs_current(previous)):
+        return previous, {'written': 0, 'unchanged': len(previous['ornaments']), 'removed': 0}
+
+    img = Image.open(sheet_path)
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    regions = find_individual_objects(np.array(img), min_size=min_size, threshold=threshold, padding=padding)
+
+    old_records = (previous or {}).get('ornaments', [])
+    old = {o['file']: o for o in old_records}
+    boxes = [tuple(int(v) for v in box) for box in regions.boxes()]
+    file_names = assign_file_names(boxes, old_records)
+    digests = {}
+    reused = []
+
+    def unchanged(file_name, ornament):
+        digests[file_name] = pixels_digest(ornament)
+        before = old.get(file_name)
+        if before and before['pixels_sha256'] == digests[file_name] \
+                and os.path.exists(os.path.join(output_dir, file_name)):
+            reused.append(file_name)
+            return before['sha256']
+        return None
+
+    entries = save_regions(img, regions, output_dir, sheet_path, threshold=threshold,
+                           file_names=file_names, unchanged=unchanged)
+
+    # Files from the previous run that no longer have a region
+    current = set(file_names)
+    removed = 0
+    for file_name in old:
+        if file_name not in current:
+            try:
+                os.remove(os.path.join(output_dir, file_name))
+                removed += 1
+            except OSError:
+                pass
+
+    records = [
+        {'file': entry['file'], 'box': list(box), 'pixels_sha256': digests[entry['file']], 'sha256': entry['sha256']}
+        for entry, box in zip(entries, boxes)
+    ]
+    entry = {
+        'sheet_hash': sheet_hash,
+        'params': params,
+        'ornaments': records,
+        'outputs': extraction_cache.describe_outputs([os.path.join(output_dir, name) for name in file_names]),
+    }
+    return entry, {'written': len(entries) - len(reused), 'unchanged': len(reused), 'removed': removed}
+
+def process(paths, output_root, state, **params):
+    """Update every sheet in paths and persist the new state"""
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        output_dir = sheet_output_dir(output_root, path)
+        try:
+            entry, counts = update_sheet(path, output_dir, state.get(path), **params)
+        except Exception as e:
+            print(f"✗ {path}: {e}")
+            continue
+        if entry is not state.get(path):
+            state[path] = entry
+            print(f"✓ {os.path.basename(path)}: {counts['written']} written, "
+                  f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+    save_state(output_root, state)
+
+def watch(patterns, output_root, interval=1.0, debounce=2.0, once=False, **params):
+    """
+    Poll the patterns and re-extract sheets after they stop changing for
+    debounce seconds
+    """
+    os.makedirs(output_root, exist_ok=True)
+    state = load_state(output_root)
+
+    # Catch up with anything that changed while we were not running
+    seen = scan(patterns)
+    process(seen, output_root, state, **params)
+    if once:
+        return
+
+    print(f"Watching {', '.join(patterns)} (Ctrl+C to stop)...")
+    changed_at = {}
+    try:
+        while True:
+            time.sleep(interval)
+            now = time.monotonic()
+            current = scan(patterns)
+            for path, signature in current.items():
+                if seen.get(path) != signature:
+                    changed_at[path] = now
+            seen = current
+
+            ready = [path for path, when in changed_at.items() if now - when >= debounce]
+            if ready:
+                for path in ready:
+                    del changed_at[path]
+                process(ready, output_root, state, **params)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch sprite sheets and re-extract the ones that change")
+    parser.add_argument('patterns', nargs='*', default=DEFAULT_PATTERNS,
+                        help="sheet files or glob patterns to watch")
+    parser.add_argument('-o', '--output-dir', default='assets/ornaments/watched',
+                        help="root folder, one sub-folder is kept per sheet")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between polls")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="seconds a sheet must stay unchanged before it is processed")
+    parser.add_argument('--once', action='store_true', help="process changed sheets once and exit")
+    parser.add_argument('--min-size', type=int, default=100)
+    parser.add_argument('--threshold', type=int, default=50)
+    parser.add_argument('--padding', type=int, default=2)
+    args = parser.parse_args()
+
+    watch(args.patterns, args.output_dir, args.interval, args.debounce, args.once,
+          min_size=args.min_size, threshold=args.threshold, padding=args.padding)
+
+if __name__ == '__main__':
+    main()